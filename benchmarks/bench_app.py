@@ -0,0 +1,290 @@
+"""Benchmark the app's hot paths on synthetic collections, without a display.
+
+Each step runs the code behind one UI action, minus the Tk widgets:
+
+    load       load_file: _extend_cards for each CSV chunk, building CardModel and its indexes
+    reload     load_file again with the parsed CSV cache
+    keystroke  filter_cards: _compute_filter for each prefix of a typed search
+    sort       a sort key change (first order) and an order flip
+    select     on_card_select: _card_details, the card's row and its tags
+    tag        tag_current_card: TagStore.add, journal fsync included
+    command    generate_command: _ordered_codes and every TagCommands chunk
+    search     simple_search_image against a local stand-in for Google and Bing
+    display    _display_image: probe check, download, decode and resize of a result
+
+Collections are generated by synthetic.py into a temporary folder and the
+search steps use stand_in.py, so the runs need no network and no input files.
+
+    python benchmarks/bench_app.py
+    python benchmarks/bench_app.py --rows 1000,100000,1000000 --json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import numpy as np
+import pandas as pd
+
+from main import (CandidateValidator, CollectionLoader, CsvCache, HttpClient, ImageCache,
+                  ImageFetcher, ImageSearcher, KarutaImageFinder, SortCache, TagCommands, TagStore)
+from synthetic import TAGS, write_collection
+from stand_in import SearchStandIn
+
+DEFAULT_ROWS = "1000,10000,100000"
+FRAME_SIZE = (780, 580)  # Image frame of the default window size
+
+class HeadlessApp:
+    """KarutaImageFinder's card state, running its widget-free methods without any widgets"""
+
+    _extend_cards = KarutaImageFinder._extend_cards
+    _update_list_columns = KarutaImageFinder._update_list_columns
+    _card_details = KarutaImageFinder._card_details
+    _compute_filter = KarutaImageFinder._compute_filter
+    _ordered_codes = KarutaImageFinder._ordered_codes
+
+    def __init__(self):
+        self.cards = None
+        self.search_index = None
+        self.sort_cache = None
+        self.list_columns = None
+        self.cards_lock = threading.Lock()
+        self.tag_cards = {tag: {} for tag in TAGS}
+
+def work_subdir(work_dir, name):
+    """A folder for one cache, like get_cache_dir but under the benchmark's own folder"""
+    path = os.path.join(work_dir, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def timed(function, *args):
+    """Return (ms, result) of one call"""
+    started = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+def summarize(rows, step, timings, **extra):
+    ordered = sorted(timings)
+    result = {
+        "rows": rows,
+        "step": step,
+        "runs": len(ordered),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3)
+    }
+    result.update(extra)
+    return result
+
+def load(csv_path, cache):
+    app = HeadlessApp()
+    loader = CollectionLoader(csv_path, cache=cache)
+    for chunk in loader.iter_chunks():
+        app._extend_cards(chunk)
+    return app, loader.from_cache
+
+def bench_load(rows, csv_path, work_dir, repeat):
+    results = []
+    timings = []
+    for _ in range(repeat):
+        ms, (app, _) = timed(load, csv_path, None)
+        timings.append(ms)
+    memory = sum(app.cards.memory_usage().values())
+    results.append(summarize(rows, "load", timings, cards=app.cards.live_count(), model_bytes=memory))
+
+    # The first load with a cache stores the parsed CSV, later ones read it back
+    cache = CsvCache(work_subdir(work_dir, f"csv-{rows}"))
+    load(csv_path, cache)
+    timings = []
+    for _ in range(repeat):
+        ms, (app, from_cache) = timed(load, csv_path, cache)
+        timings.append(ms)
+    results.append(summarize(rows, "reload", timings, from_cache=from_cache))
+    return app, results
+
+def typed_searches(app, rng):
+    """(step, mode, text) typed one character at a time, based on the collection's own names"""
+    cards = app.cards
+    row = rng.randrange(len(cards))
+    character = cards.names['character'][cards.column('character')[row]]
+    series = cards.names['series'][cards.column('series')[row]]
+    misspelt = character[:1] + character[2:] if len(character) > 3 else character
+    query = f"burnValue >= 40 and series:'{series.split()[0].lower()}' and untagged"
+    return [
+        ("keystroke:character", "Contains", character),
+        ("keystroke:series", "Contains", series),
+        ("keystroke:fuzzy", "Fuzzy", misspelt),
+        ("keystroke:query", "Query", query)
+    ]
+
+def bench_keystrokes(rows, app, rng):
+    results = []
+    for step, mode, text in typed_searches(app, rng):
+        tags = {tag: tuple(codes) for tag, codes in app.tag_cards.items()} if mode == "Query" else None
+        timings = []
+        matches = 0
+        for length in range(1, len(text) + 1):
+            query = (text[:length].lower(), mode, tags, True, ["Burn Value"], False)
+            ms, row_ids = timed(app._compute_filter, query, lambda: False)
+            timings.append(ms)
+            matches = 0 if row_ids is None or isinstance(row_ids, Exception) else len(row_ids)
+        results.append(summarize(rows, step, timings, text=text, matches=matches))
+    return results
+
+def bench_sort(rows, app):
+    results = []
+    all_rows = np.flatnonzero(app.cards.live)
+    sort_cache = SortCache(app.cards)
+    for key in sort_cache.keys:
+        ms, _ = timed(sort_cache.sort_rows, all_rows, [key], False)
+        flips = [timed(sort_cache.sort_rows, all_rows, [key], ascending)[0] for ascending in (True, False) * 5]
+        results.append(summarize(rows, f"sort:{key}", [ms], flip_median_ms=round(statistics.median(flips), 3)))
+    return results
+
+def bench_select(rows, app, rng, count=200):
+    row_ids = [rng.randrange(len(app.cards)) for _ in range(count)]
+    timings = [timed(app._card_details, row_id)[0] for row_id in row_ids]
+    return [summarize(rows, "select", timings)]
+
+def bench_tagging(rows, app, csv_path, work_dir, rng, count=200):
+    store = TagStore(TAGS, work_subdir(work_dir, "tags"))
+    store.open(csv_path)
+    codes = [app.cards.code_at(rng.randrange(len(app.cards))) for _ in range(count)]
+    timings = [timed(store.add, rng.choice(TAGS), code)[0] for code in codes]
+    store.close()
+
+    # A big tag for the commands; a tenth of the collection, in random order
+    tagged = rng.sample(range(len(app.cards)), max(1, len(app.cards) // 10))
+    app.tag_cards["burn"] = dict.fromkeys(app.cards.code_at(row_id) for row_id in tagged)
+    results = [summarize(rows, "tag", timings)]
+    for order in TagCommands.ORDERS:
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            commands = TagCommands("burn", app._ordered_codes(app.tag_cards["burn"], order))
+            chunks = sum(1 for _ in commands)
+            timings.append((time.perf_counter() - started) * 1000)
+        results.append(summarize(rows, f"command:{order.lower()}", timings, cards=len(tagged), commands=chunks))
+    return results
+
+def bench_search(rows, app, work_dir, rng, repeat, latency_ms):
+    """simple_search_image then _display_image of the first result, against the stand-in"""
+    results = []
+    search_timings, first_timings, display_timings, cached_timings = [], [], [], []
+    with SearchStandIn(latency_ms=latency_ms) as stand_in:
+        http = HttpClient()
+        searcher = ImageSearcher(http, providers=stand_in.providers)
+        fetcher = ImageFetcher(http, ImageCache(work_subdir(work_dir, "images")))
+        validator = CandidateValidator(fetcher.probe)
+        cards = app.cards
+        for _ in range(repeat):
+            row = rng.randrange(len(cards))
+            character = cards.names['character'][cards.column('character')[row]]
+            series = cards.names['series'][cards.column('series')[row]]
+
+            first = []
+            started = time.perf_counter()
+
+            def on_results(new_urls):
+                if not first:
+                    first.append((time.perf_counter() - started) * 1000)
+                    validator.probe_ahead(new_urls[1:])
+
+            image_urls = searcher.search(character, series, on_results)
+            search_timings.append((time.perf_counter() - started) * 1000)
+            first_timings.append(first[0] if first else search_timings[-1])
+
+            # Like _prepare_image, going down the results until one is usable;
+            # the second time the image comes from the image cache
+            for timings in (display_timings, cached_timings):
+                started = time.perf_counter()
+                for url in image_urls:
+                    usable, _ = validator.check(url)
+                    if not usable:
+                        continue
+                    try:
+                        fetcher.fetch(url, FRAME_SIZE)
+                        break
+                    except Exception:
+                        validator.reject(url, "failed")
+                timings.append((time.perf_counter() - started) * 1000)
+        urls = len(image_urls)
+        requests_served = stand_in.requests
+
+    results.append(summarize(rows, "search", search_timings, first_results_ms=round(statistics.median(first_timings), 3),
+                             urls=urls, latency_ms=latency_ms, requests=requests_served))
+    results.append(summarize(rows, "display", display_timings))
+    results.append(summarize(rows, "display:cached", cached_timings))
+    return results
+
+def run(row_counts, repeat, search_repeat, latency_ms, seed):
+    rng = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="karuta-bench-") as work_dir:
+        app = None
+        for rows in row_counts:
+            csv_path = os.path.join(work_dir, f"collection-{rows}.csv")
+            write_collection(csv_path, rows, seed)
+
+            app, load_results = bench_load(rows, csv_path, work_dir, repeat)
+            results.extend(load_results)
+            # Tagging first, so the later steps see a collection with a big tag
+            results.extend(bench_tagging(rows, app, csv_path, work_dir, rng))
+            results.extend(bench_select(rows, app, rng))
+            results.extend(bench_keystrokes(rows, app, rng))
+            results.extend(bench_sort(rows, app))
+
+        # Searching doesn't depend on the collection size, it runs once on the last one
+        if search_repeat and app is not None:
+            results.extend(bench_search(rows, app, work_dir, rng, search_repeat, latency_ms))
+    return results
+
+def environment():
+    """What the results were measured on, so runs of different versions can be compared"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="comma separated collection sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="loads per collection size")
+    parser.add_argument("--search-repeat", type=int, default=5, help="cards searched, 0 to skip searching")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay the stand-in adds to every response")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the collections and the picked cards")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    row_counts = [int(value) for value in args.rows.split(",") if value.strip()]
+    results = run(row_counts, args.repeat, args.search_repeat, args.latency_ms, args.seed)
+
+    print(f"{'rows':>9}  {'step':<22}{'runs':>6}{'median ms':>11}{'p95 ms':>10}{'max ms':>10}")
+    for row in results:
+        print(f"{row['rows']:>9,}  {row['step']:<22}{row['runs']:>6}{row['median_ms']:>11.2f}{row['p95_ms']:>10.2f}{row['max_ms']:>10.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
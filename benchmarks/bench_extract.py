@@ -0,0 +1,115 @@
+"""Benchmark the search result page extractor against saved result pages.
+
+Times each ResultPageExtractor backend (plus the old BeautifulSoup scraper
+when bs4 is installed) over the pages in benchmarks/fixtures and reports
+the parse time and how many image URLs survive filtering.
+
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --repeat 50 --json results.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import HAS_LXML, ImageSearcher, ResultPageExtractor
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Saved result page -> provider it came from
+FIXTURES = {
+    "google_results.html": "google",
+    "bing_results.html": "bing"
+}
+
+def legacy_extract(page, provider):
+    """The scraper used before ResultPageExtractor, kept as a baseline"""
+    soup = BeautifulSoup(page, 'html.parser')
+    image_urls = []
+
+    for img in soup.find_all('img'):
+        if img.has_attr('src') and ('http' in img['src'] or '//' in img['src']):
+            url = img['src']
+            if url.startswith('//'):
+                url = 'https:' + url
+            if url not in image_urls and not url.endswith('.svg'):
+                image_urls.append(url)
+
+    if provider == "google":
+        for script in soup.find_all("script"):
+            script_text = script.string or ""
+            for url, _ in re.findall(r'(https?://[^\s"\']+\.(jpg|jpeg|png|gif))', script_text):
+                if url not in image_urls:
+                    image_urls.append(url)
+
+        for script in soup.find_all('script'):
+            if script.string and '"ou":"http' in script.string:
+                for url in re.findall(r'"ou":"(http[^"]+)"', script.string):
+                    if url not in image_urls:
+                        image_urls.append(url)
+    return image_urls
+
+def time_extractor(extract, page, repeat):
+    """Return (median ms, urls) over repeat runs"""
+    timings = []
+    urls = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        urls = extract(page)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), urls
+
+def run(repeat):
+    extractors = {"regex": ResultPageExtractor("regex").extract}
+    if HAS_LXML:
+        extractors["lxml"] = ResultPageExtractor("lxml").extract
+
+    results = []
+    for filename, provider in FIXTURES.items():
+        with open(os.path.join(FIXTURE_DIR, filename), encoding="utf-8") as f:
+            page = f.read()
+
+        runs = dict(extractors)
+        if BeautifulSoup is not None:
+            runs["legacy-bs4"] = lambda text, provider=provider: legacy_extract(text, provider)
+
+        for name, extract in runs.items():
+            median_ms, urls = time_extractor(extract, page, repeat)
+            results.append({
+                "fixture": filename,
+                "extractor": name,
+                "page_bytes": len(page.encode("utf-8")),
+                "median_ms": round(median_ms, 3),
+                "urls": len(urls),
+                "usable_urls": len(ImageSearcher.filter_urls(urls))
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="runs per extractor and page")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    print(f"{'fixture':<22}{'extractor':<12}{'median ms':>10}{'urls':>7}{'usable':>8}")
+    for row in results:
+        print(f"{row['fixture']:<22}{row['extractor']:<12}{row['median_ms']:>10.2f}{row['urls']:>7}{row['usable_urls']:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Serve the saved Google/Bing result pages and generated images locally.
+
+Every URL in the pages in benchmarks/fixtures is pointed back at this
+server under a folder named after the search query, so each search gets
+its own image URLs. Any path other than the search pages answers with a
+JPEG, and the search -> display path runs offline with repeatable timings.
+
+    python benchmarks/stand_in.py --port 8765
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageFilter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Search page path -> saved result page
+PAGES = {
+    "/google/search": "google_results.html",
+    "/bing/images/search": "bing_results.html"
+}
+
+# Absolute URLs, also when escaped inside JSON as https:\/\/host
+URL_PREFIX = re.compile(r"https?:(//|\\/\\/)[A-Za-z0-9.-]+(:\d+)?")
+QUERY_MARKER = "__query__"
+
+def make_jpeg(size, seed):
+    """A noisy JPEG, which decodes about as slowly as a photo of the same size"""
+    noise = Image.effect_noise(size, 60 + seed * 7).convert("RGB")
+    image = noise.filter(ImageFilter.GaussianBlur(2))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+        path, _, query = self.path.partition("?")
+        if path in stand_in.pages:
+            folder = hashlib.md5(query.encode("utf-8")).hexdigest()[:12]
+            body = stand_in.pages[path].replace(QUERY_MARKER.encode("ascii"), folder.encode("ascii"))
+            content_type = "text/html; charset=utf-8"
+        else:
+            # The same path always gets the same image
+            index = int(hashlib.md5(path.encode("utf-8")).hexdigest(), 16) % len(stand_in.images)
+            body, content_type = stand_in.images[index], "image/jpeg"
+        with stand_in.lock:
+            stand_in.requests += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class SearchStandIn:
+    """A local HTTP server standing in for the search providers and image hosts"""
+
+    def __init__(self, port=0, image_size=(1600, 1200), images=4, latency_ms=0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.port = self.server.server_port
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.latency = latency_ms / 1000
+        self.requests = 0  # Served so far, probes and downloads included
+        self.lock = threading.Lock()
+        self.images = [make_jpeg(image_size, seed) for seed in range(images)]
+        self.pages = {}
+        for path, filename in PAGES.items():
+            with open(os.path.join(FIXTURE_DIR, filename), encoding="utf-8") as f:
+                self.pages[path] = self.localize(f.read()).encode("utf-8")
+        self._thread = None
+
+    def localize(self, page):
+        """Point every absolute URL of a page at this server, keeping the paths"""
+        def local_prefix(match):
+            separator = "/" if match.group(1) == "//" else "\\/"
+            return f"http:{match.group(1)}127.0.0.1:{self.port}{separator}{QUERY_MARKER}"
+        return URL_PREFIX.sub(local_prefix, page)
+
+    @property
+    def providers(self):
+        """Search provider URLs for ImageSearcher, like SEARCH_PROVIDERS"""
+        return {
+            "google": self.base_url + "/google/search?q={query}&tbm=isch",
+            "bing": self.base_url + "/bing/images/search?q={query}&form=HDRSC2&first=1"
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every response")
+    args = parser.parse_args()
+
+    stand_in = SearchStandIn(args.port, latency_ms=args.latency_ms)
+    for provider, url in stand_in.providers.items():
+        print(f"{provider}: {url}")
+    try:
+        stand_in.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.server.server_close()
+
+if __name__ == "__main__":
+    main()
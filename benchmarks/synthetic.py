@@ -0,0 +1,133 @@
+"""Generate synthetic Karuta collection CSVs for the benchmarks.
+
+Series popularity and the characters within each series follow Zipf-like
+weights, so a few series and characters repeat a lot like in a real
+collection. The same seed always gives the same file.
+
+    python benchmarks/synthetic.py 100000 collection.csv
+    python benchmarks/synthetic.py 1000000 big.csv --seed 7
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['code', 'number', 'edition', 'character', 'series', 'quality', 'obtainedDate',
+           'burnValue', 'dyeCode', 'tag', 'frame', 'wishlists']
+
+SYLLABLES = ["a", "ka", "ri", "to", "mi", "na", "ru", "shi", "ko", "yu", "ha", "re", "zu",
+             "ki", "sa", "no", "mo", "ta", "ro", "e", "ai", "ji", "ku", "se", "ne", "ho"]
+
+# Words that make series names look like real titles and share substrings across series
+SERIES_WORDS = ["Academy", "Chronicles", "Online", "Zero", "Hunter", "Piece", "Heroes", "Kingdom",
+                "Tale", "Blade", "Stars", "Love", "Magical", "Re:", "no", "Girl", "Ninja", "Titan"]
+
+# Names reused by several series, as with common given names
+SHARED_NAMES = ["Rem", "Emilia", "Sakura", "Kaito", "Yuki", "Hikari", "Ren", "Akira", "Mikasa", "Zoro"]
+
+TAGS = ["burn", "cute", "kot", "favorite", "good", "ok", "wife"]
+
+def zipf_weights(count, exponent, rng):
+    """Weights that fall off like a Zipf distribution, in a shuffled order"""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+def make_name(rng, words):
+    return " ".join("".join(rng.choice(SYLLABLES, rng.integers(2, 5))).title() for _ in range(words))
+
+def make_series(count, rng):
+    names = set()
+    while len(names) < count:
+        name = make_name(rng, int(rng.integers(1, 3)))
+        if rng.random() < 0.5:
+            name = f"{name} {rng.choice(SERIES_WORDS)}"
+        if rng.random() < 0.05:
+            name = name.replace("a", "á", 1)  # A few accented names for the fuzzy search
+        names.add(name)
+    return sorted(names)
+
+def make_cast(series_count, rng):
+    """Characters of every series as (names, series index, weight within the series)"""
+    names, owners, weights = [], [], []
+    for series in range(series_count):
+        size = int(rng.integers(1, 40))
+        cast = set()
+        while len(cast) < size:
+            if rng.random() < 0.05:
+                cast.add(str(rng.choice(SHARED_NAMES)))
+            else:
+                cast.add(make_name(rng, int(rng.integers(1, 3))))
+        names.extend(sorted(cast))
+        owners.extend([series] * size)
+        weights.extend(zipf_weights(size, 1.2, rng))
+    return np.array(names, dtype=object), np.array(owners), np.array(weights)
+
+def make_codes(rows, rng):
+    """Distinct lowercase base 36 codes, like Karuta's"""
+    values = rng.choice(36 ** 6, size=rows, replace=False)
+    digits = np.array(list("0123456789abcdefghijklmnopqrstuvwxyz"))
+    chars = []
+    for _ in range(6):
+        chars.append(digits[values % 36])
+        values = values // 36
+    codes = pd.Series(chars[5]).str.cat(chars[4::-1])
+    return codes.str.lstrip("0").replace("", "0")
+
+def generate(rows, seed=1, series_count=None):
+    """A synthetic collection as a DataFrame with the columns of a Karuta export"""
+    rng = np.random.default_rng(seed)
+    series_count = series_count or max(20, min(6000, rows // 40))
+    series_names = make_series(series_count, rng)
+    character_names, owners, cast_weights = make_cast(series_count, rng)
+
+    # Pick a series by popularity, then a character of that series by its own weight.
+    # Each series' cast weights sum to 1, so series + cumulative weight is one sorted
+    # axis and a single searchsorted picks every row's character.
+    series = rng.choice(series_count, size=rows, p=zipf_weights(series_count, 1.05, rng))
+    starts = np.searchsorted(owners, np.arange(series_count))
+    sizes = np.bincount(owners, minlength=series_count)
+    cumulative = np.cumsum(cast_weights) - np.repeat(np.cumsum(cast_weights)[starts] - cast_weights[starts], sizes)
+    characters = np.searchsorted(owners + cumulative, series + rng.random(rows), side="right")
+    characters = np.minimum(characters, starts[series] + sizes[series] - 1)
+
+    wishlists = np.round(rng.pareto(1.5, rows) * 5).astype(int)
+    quality = rng.choice(5, size=rows, p=[0.3, 0.25, 0.2, 0.15, 0.1])
+    number = np.minimum(rng.pareto(0.8, rows) * 200 + 1, 99999).astype(int)
+    burn_value = np.round((10 + wishlists * 2 + quality * 5) * (1 + 200 / (number + 50))).astype(int)
+    tags = np.where(rng.random(rows) < 0.15, rng.choice(TAGS, size=rows), "")
+
+    return pd.DataFrame({
+        'code': make_codes(rows, rng),
+        'number': number,
+        'edition': rng.integers(1, 7, size=rows),
+        'character': character_names[characters],
+        'series': np.array(series_names, dtype=object)[series],
+        'quality': quality,
+        'obtainedDate': pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 700, size=rows), unit="D"),
+        'burnValue': burn_value,
+        'dyeCode': "",
+        'tag': tags,
+        'frame': np.where(rng.random(rows) < 0.05, "Gold", ""),
+        'wishlists': wishlists
+    }, columns=COLUMNS)
+
+def write_collection(path, rows, seed=1):
+    """Write a synthetic collection CSV, returning the DataFrame written"""
+    cards = generate(rows, seed)
+    cards.to_csv(path, index=False, date_format="%Y-%m-%d")
+    return cards
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", type=int, help="number of cards")
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    cards = write_collection(args.output, args.rows, args.seed)
+    print(f"Wrote {len(cards):,} cards, {cards['series'].nunique():,} series and "
+          f"{cards['character'].nunique():,} characters to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,2398 @@
 try:
     import sys
     import pandas as pd
+    import numpy as np
     import requests
-    from bs4 import BeautifulSoup
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     import io
-    from PIL import Image, ImageTk
-    import tkinter as tk
-    from tkinter import ttk, messagebox, filedialog
+    from PIL import Image, ImageFile
     import threading
+    import queue
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from concurrent.futures import TimeoutError as FutureTimeoutError
     import urllib.parse
     import os
     import time
     import re
+    import unicodedata
+    import html as html_lib
+    import json
+    import csv
+    import shutil
+    import argparse
+    import hashlib
+    import sqlite3
 except ImportError as e:
     print(f"Error: Missing dependency - {e}")
     print("\nPlease install required packages using:")
-    print("pip install pandas requests beautifulsoup4 pillow")
-    if "tkinter" in str(e):
-        print("\nNote: Tkinter should be included with Python, but may need to be installed separately.")
-        print("- On Windows: Reinstall Python and check 'tcl/tk and IDLE'")
-        print("- On Linux: sudo apt-get install python3-tk")
-        print("- On Mac: brew install python-tk")
+    print("pip install pandas requests pillow")
     sys.exit(1)
 
+# Tkinter is only needed by the UI, so --batch also runs on a server without it
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+    import tkinter.font as tkfont
+    from PIL import ImageTk
+    HAS_TK = True
+except ImportError as e:
+    HAS_TK = False
+    TK_IMPORT_ERROR = e
+
+# Feather is used for the CSV cache when pyarrow is installed, pickle otherwise
+try:
+    import pyarrow
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# lxml is an optional, faster way to walk result pages
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# Per-user directory for the app's on-disk caches
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".karutatag")
+
+def get_cache_dir(name):
+    """Return a cache subdirectory, creating it if needed"""
+    path = os.path.join(CACHE_DIR, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def shutdown_executor(executor):
+    """Stop a worker pool without waiting for it, dropping the work still queued"""
+    try:
+        executor.shutdown(wait=False, cancel_futures=True)
+    except TypeError:
+        # Python before 3.9 can't drop queued work
+        executor.shutdown(wait=False)
+
+class CardSearchIndex:
+    """Substring and fuzzy search over character and series names, built once per load"""
+    
+    NGRAM = 3
+    FUZZY_MIN_SCORE = 0.4  # Share of the query's trigrams a match needs, plus 0.5 for a substring hit
+    
+    def __init__(self, characters=(), series=()):
+        # Lowercased names are deduplicated so each distinct name is indexed once
+        self.char_ids, self.char_names, self.char_grams = {}, [], {}
+        self.series_ids, self.series_names, self.series_grams = {}, [], {}
+        # Accent and space free forms of the same names, with their own trigrams
+        self.char_fuzzy, self.char_fuzzy_grams = [], {}
+        self.series_fuzzy, self.series_fuzzy_grams = [], {}
+        self.char_codes = np.empty(0, dtype=np.intp)
+        self.series_codes = np.empty(0, dtype=np.intp)
+        self.live = np.empty(0, dtype=bool)  # False for rows removed by a reload
+        self.add_rows(characters, series)
+    
+    def add_rows(self, characters, series):
+        """Index rows appended to the collection, e.g. a newly loaded chunk"""
+        self.char_codes = np.concatenate([self.char_codes, self._add_char_names(characters)])
+        self.series_codes = np.concatenate([self.series_codes, self._add_series_names(series)])
+        self.live = np.concatenate([self.live, np.ones(len(self.char_codes) - len(self.live), dtype=bool)])
+        self._reset()
+    
+    def update_rows(self, row_ids, characters, series):
+        """Re-index rows whose names changed"""
+        self.char_codes[row_ids] = self._add_char_names(characters)
+        self.series_codes[row_ids] = self._add_series_names(series)
+        self._reset()
+    
+    def remove_rows(self, row_ids):
+        """Leave rows out of every search; their ids stay reserved"""
+        self.live[row_ids] = False
+        self._reset()
+    
+    def _reset(self):
+        self.all_rows = np.flatnonzero(self.live)
+        
+        # Previous query and its matches, used to refine narrowing queries
+        self._last_query = ""
+        self._last_rows = self.all_rows
+        self._last_chars = None
+        self._last_series = None
+    
+    def _add_char_names(self, values):
+        return self._add_names(values, self.char_ids, self.char_names, self.char_grams,
+                               self.char_fuzzy, self.char_fuzzy_grams)
+    
+    def _add_series_names(self, values):
+        return self._add_names(values, self.series_ids, self.series_names, self.series_grams,
+                               self.series_fuzzy, self.series_fuzzy_grams)
+    
+    @classmethod
+    def _add_names(cls, values, ids, names, grams, fuzzy_names, fuzzy_grams):
+        """Map values to name ids, indexing names that haven't been seen yet"""
+        lowered = pd.Series(values, dtype=object).fillna("").astype(str).str.lower()
+        codes, uniques = pd.factorize(lowered)
+        name_ids = np.empty(len(uniques), dtype=np.intp)
+        for i, name in enumerate(uniques):
+            name_id = ids.get(name)
+            if name_id is None:
+                name_id = ids[name] = len(names)
+                names.append(name)
+                for gram in cls._grams(name):
+                    grams.setdefault(gram, set()).add(name_id)
+                fuzzy_name = cls.normalize(name)
+                fuzzy_names.append(fuzzy_name)
+                for gram in cls._grams(f" {fuzzy_name} "):
+                    fuzzy_grams.setdefault(gram, set()).add(name_id)
+            name_ids[i] = name_id
+        return name_ids[codes]
+    
+    @staticmethod
+    def normalize(text):
+        """Lowercase text with no accents, spaces or punctuation: "Émilia-tan" becomes emiliatan"""
+        decomposed = unicodedata.normalize("NFKD", text)
+        return "".join(ch for ch in decomposed if ch.isalnum()).casefold()
+    
+    @classmethod
+    def _grams(cls, text):
+        return {text[i:i + cls.NGRAM] for i in range(len(text) - cls.NGRAM + 1)}
+    
+    def _match_names(self, query, names, grams, candidates=None):
+        """Return the ids of the distinct names containing query"""
+        if candidates is None:
+            if len(query) >= self.NGRAM:
+                postings = []
+                for gram in self._grams(query):
+                    if gram not in grams:
+                        return np.empty(0, dtype=np.intp)
+                    postings.append(grams[gram])
+                postings.sort(key=len)
+                candidates = set.intersection(*postings)
+            else:
+                candidates = range(len(names))
+        return np.fromiter((i for i in candidates if query in names[i]), dtype=np.intp)
+    
+    def search(self, query):
+        """Return the row ids whose character or series contains query"""
+        query = query.lower()
+        if not query:
+            rows, chars, series = self.all_rows, None, None
+        else:
+            # A query containing the previous one can only match a subset of its rows
+            if self._last_query and self._last_query in query:
+                rows = self._last_rows
+                chars = self._match_names(query, self.char_names, self.char_grams, self._last_chars)
+                series = self._match_names(query, self.series_names, self.series_grams, self._last_series)
+            else:
+                rows = self.all_rows
+                chars = self._match_names(query, self.char_names, self.char_grams)
+                series = self._match_names(query, self.series_names, self.series_grams)
+            
+            char_hit = np.zeros(len(self.char_names), dtype=bool)
+            char_hit[chars] = True
+            series_hit = np.zeros(len(self.series_names), dtype=bool)
+            series_hit[series] = True
+            rows = rows[char_hit[self.char_codes[rows]] | series_hit[self.series_codes[rows]]]
+        
+        self._last_query = query
+        self._last_rows = rows
+        self._last_chars = chars
+        self._last_series = series
+        return rows
+    
+    def _fuzzy_name_scores(self, query, query_grams, fuzzy_names, fuzzy_grams):
+        """Per distinct name: how many of the query's trigrams it has, and whether it contains the query"""
+        hits = np.zeros(len(fuzzy_names), dtype=np.float32)
+        for gram in query_grams:
+            name_ids = fuzzy_grams.get(gram)
+            if name_ids:
+                hits[np.fromiter(name_ids, dtype=np.intp, count=len(name_ids))] += 1
+        contains = np.fromiter((query in name for name in fuzzy_names), dtype=bool, count=len(fuzzy_names))
+        return hits, contains
+    
+    def fuzzy_search(self, query):
+        """Return (row ids, scores) of rows whose names resemble query, unordered
+        
+        Scores are the share of the query's trigrams found in the character and
+        series names, plus 0.5 when a name contains the whole normalized query.
+        """
+        query = self.normalize(query)
+        if not query:
+            return self.all_rows, np.zeros(len(self.all_rows), dtype=np.float32)
+        
+        query_grams = self._grams(f" {query} ")
+        char_hits, char_contains = self._fuzzy_name_scores(query, query_grams, self.char_fuzzy, self.char_fuzzy_grams)
+        series_hits, series_contains = self._fuzzy_name_scores(query, query_grams, self.series_fuzzy, self.series_fuzzy_grams)
+        
+        # Trigrams can be split between the character and the series, e.g. "rem re zero"
+        chars = self.char_codes[self.all_rows]
+        series = self.series_codes[self.all_rows]
+        scores = np.minimum((char_hits[chars] + series_hits[series]) / len(query_grams), 1.0)
+        scores += 0.5 * (char_contains[chars] | series_contains[series])
+        matched = scores >= self.FUZZY_MIN_SCORE
+        return self.all_rows[matched], scores[matched]
+
+class FilterScheduler:
+    """Debounces search keystrokes and runs the filter on a worker thread"""
+    
+    def __init__(self, root, compute, apply, delay_ms=150, poll_ms=20):
+        self.root = root
+        self.compute = compute  # Called on the worker as compute(query, is_stale)
+        self.apply = apply      # Called on the Tk thread as apply(query, result)
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        
+        self._generation = 0
+        self._after_id = None
+        self._poll_id = None
+        self._request = None
+        self._result = None
+        self._running = False
+        self._cond = threading.Condition()
+        self._worker = None
+    
+    def schedule(self, query, delay_ms=None):
+        """Queue a filter run, replacing any query that hasn't finished yet"""
+        self._generation += 1
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        delay = self.delay_ms if delay_ms is None else delay_ms
+        self._after_id = self.root.after(delay, self._submit, self._generation, query)
+    
+    def _submit(self, generation, query):
+        self._after_id = None
+        with self._cond:
+            self._request = (generation, query)
+            self._cond.notify()
+        
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+        
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+    
+    def _is_stale(self, generation):
+        return generation != self._generation
+    
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._request is None:
+                    self._cond.wait()
+                generation, query = self._request
+                self._request = None
+                self._running = True
+            
+            result = None
+            try:
+                # Drop queries that were superseded while waiting
+                if not self._is_stale(generation):
+                    result = self.compute(query, lambda: self._is_stale(generation))
+            except Exception as e:
+                print(f"Filter error: {str(e)}")
+            
+            with self._cond:
+                if result is not None and not self._is_stale(generation):
+                    self._result = (generation, query, result)
+                self._running = False
+    
+    def _poll(self):
+        with self._cond:
+            pending, self._result = self._result, None
+            busy = self._request is not None or self._running
+        
+        # Only the newest query's result ever reaches the UI
+        if pending and not self._is_stale(pending[0]):
+            self.apply(pending[1], pending[2])
+        
+        if busy or self._after_id is not None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+        else:
+            self._poll_id = None
+
+class UiDispatcher:
+    """Runs UI updates posted by worker threads on the Tk thread, on a fixed tick"""
+    
+    def __init__(self, root, tick_ms=30):
+        self.root = root
+        self.tick_ms = tick_ms
+        self._queue = queue.Queue()
+        self.root.after(self.tick_ms, self._drain)
+    
+    def post(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) on the Tk thread; safe from any thread"""
+        self._queue.put((None, func, args, kwargs))
+    
+    def post_latest(self, key, func, *args, **kwargs):
+        """Like post, but only the latest update per key within one tick runs"""
+        self._queue.put((key, func, args, kwargs))
+    
+    def _drain(self):
+        updates = []
+        while True:
+            try:
+                updates.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        # Collapse keyed updates, e.g. a burst of status messages, to the newest one
+        latest = {key: index for index, (key, _, _, _) in enumerate(updates) if key is not None}
+        for index, (key, func, args, kwargs) in enumerate(updates):
+            if key is not None and latest[key] != index:
+                continue
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"UI update error: {str(e)}")
+        
+        self.root.after(self.tick_ms, self._drain)
+
+# The widgets need Tkinter, which batch mode does without
+if HAS_TK:
+    class VirtualCardList(tk.Frame):
+        """Card list that only creates Listbox rows for the part currently on screen"""
+        
+        def __init__(self, master, format_row, **listbox_options):
+            super().__init__(master, bg=master.cget("bg"))
+            self.format_row = format_row  # Turns a row id into the display text
+            self.row_ids = np.empty(0, dtype=np.intp)
+            self.top = 0            # Position of the first visible row
+            self.selected = None    # Position of the selected row, if any
+            self.visible_rows = listbox_options.get("height", 25)
+            
+            self.scrollbar = tk.Scrollbar(self, command=self._on_scrollbar)
+            self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            
+            self.listbox = tk.Listbox(self, exportselection=False, **listbox_options)
+            self.listbox.pack(fill=tk.BOTH, expand=True)
+            self.line_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+            
+            self.listbox.bind("<Configure>", self._on_resize)
+            self.listbox.bind("<<ListboxSelect>>", self._on_listbox_select)
+            self.listbox.bind("<MouseWheel>", self._on_mousewheel)
+            self.listbox.bind("<Button-4>", lambda e: self._scroll_by(-3))
+            self.listbox.bind("<Button-5>", lambda e: self._scroll_by(3))
+            self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+            self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+            self.listbox.bind("<Prior>", lambda e: self._move_selection(-self.visible_rows))
+            self.listbox.bind("<Next>", lambda e: self._move_selection(self.visible_rows))
+            self.listbox.bind("<Home>", lambda e: self._move_selection(-len(self.row_ids)))
+            self.listbox.bind("<End>", lambda e: self._move_selection(len(self.row_ids)))
+        
+        def set_rows(self, row_ids, keep_view=False):
+            """Show a new sequence of row ids, from the top or keeping the first visible card in place"""
+            old_top = self.top
+            old_top_row = self.row_ids[self.top] if keep_view and self.top < len(self.row_ids) else None
+            
+            self.row_ids = np.asarray(row_ids, dtype=np.intp)
+            self.top = 0
+            self.selected = None
+            if old_top_row is not None:
+                position = self.position_of(old_top_row)
+                self.top = position if position is not None else old_top
+            self.refresh()
+    
+        def size(self):
+            return len(self.row_ids)
+        
+        def selected_row(self):
+            """Return the row id of the selected card, or None"""
+            if self.selected is None or self.selected >= len(self.row_ids):
+                return None
+            return int(self.row_ids[self.selected])
+        
+        def refresh(self):
+            """Redraw the rows in the viewport and update the scrollbar"""
+            total = len(self.row_ids)
+            self.top = max(0, min(self.top, total - self.visible_rows + 1))
+            window = self.row_ids[self.top:self.top + self.visible_rows]
+            
+            self.listbox.delete(0, tk.END)
+            if len(window):
+                self.listbox.insert(tk.END, *[self.format_row(row_id) for row_id in window])
+            self.listbox.yview_moveto(0)
+            
+            if self.selected is not None and self.top <= self.selected < self.top + len(window):
+                self.listbox.selection_set(self.selected - self.top)
+                self.listbox.activate(self.selected - self.top)
+            
+            if total:
+                self.scrollbar.set(self.top / total, min(1.0, (self.top + len(window)) / total))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+        
+        def see(self, position):
+            """Scroll so that the given position is visible"""
+            if position < self.top:
+                self.top = position
+            elif position >= self.top + self.visible_rows - 1:
+                self.top = position - self.visible_rows + 2
+            self.refresh()
+        
+        def position_of(self, row_id):
+            """Return the list position of a row id, or None if it isn't shown"""
+            positions = np.flatnonzero(self.row_ids == row_id)
+            return int(positions[0]) if len(positions) else None
+        
+        def select_row(self, row_id, notify=True, scroll=True):
+            """Select a card by row id if it is in the list"""
+            position = self.position_of(row_id)
+            if position is not None:
+                self.select(position, notify, scroll)
+            return position
+        
+        def select(self, position, notify=True, scroll=True):
+            """Select the row at position, scrolling it into view unless scroll is False"""
+            if not len(self.row_ids):
+                return
+            self.selected = max(0, min(position, len(self.row_ids) - 1))
+            if scroll:
+                self.see(self.selected)
+            else:
+                self.refresh()
+            if notify:
+                self.event_generate("<<CardSelect>>")
+        
+        def _on_resize(self, event):
+            # Keep one partially visible row at the bottom so there is never a gap
+            visible_rows = max(1, event.height // self.line_height + 1)
+            if visible_rows != self.visible_rows:
+                self.visible_rows = visible_rows
+                self.refresh()
+        
+        def _on_scrollbar(self, action, amount, unit=None):
+            if action == "moveto":
+                self.top = int(float(amount) * len(self.row_ids))
+                self.refresh()
+            elif action == "scroll":
+                step = self.visible_rows - 1 if unit == "pages" else 1
+                self._scroll_by(int(amount) * max(1, step))
+        
+        def _on_mousewheel(self, event):
+            self._scroll_by(-3 if event.delta > 0 else 3)
+        
+        def _scroll_by(self, rows):
+            self.top += rows
+            self.refresh()
+        
+        def _move_selection(self, delta):
+            start = self.top if self.selected is None else self.selected
+            self.select(start + delta)
+            return "break"
+        
+        def _on_listbox_select(self, event):
+            selection = self.listbox.curselection()
+            if not selection:
+                return
+            self.selected = self.top + selection[0]
+            self.event_generate("<<CardSelect>>")
+
+class CardModel:
+    """The loaded cards as compact columns instead of a DataFrame of Python strings
+    
+    Character and series names are interned, so each row only holds int32 ids;
+    codes are a fixed-width byte array and the numbers are float32.
+    """
+    
+    NAME_COLUMNS = ("character", "series")
+    NUMBER_COLUMNS = ("burnValue", "quality", "number")
+    
+    def __init__(self):
+        self.size = 0
+        self.names = {column: [] for column in self.NAME_COLUMNS}      # Column -> id -> name
+        self._name_ids = {column: {} for column in self.NAME_COLUMNS}  # Column -> name -> id
+        self._columns = {}        # Column -> array, with spare room past size while loading
+        self._code_index = None   # (row ids sorted by code, sorted codes), for lookups by code
+        self.live = np.empty(0, dtype=bool)  # False for rows removed by a reload
+        self.source_bytes = 0     # About what the same rows took as a DataFrame
+    
+    def __len__(self):
+        return self.size
+    
+    def live_count(self):
+        return int(np.count_nonzero(self.live))
+    
+    def has_column(self, column):
+        return column in self._columns
+    
+    def column(self, column):
+        """The values of one column, as ids for name columns"""
+        return self._columns[column][:self.size]
+    
+    def append(self, chunk):
+        """Add a parsed chunk of the collection"""
+        # Estimated from a sample, measuring every string costs more than building the model
+        sample = chunk.head(1000)
+        if len(sample):
+            self.source_bytes += int(sample.memory_usage(index=False, deep=True).sum() * len(chunk) / len(sample))
+        start = self.size
+        
+        self._store("code", self._encode_codes(chunk['code']), start)
+        
+        # Some exports have text qualities, those are interned like names
+        if 'quality' in chunk and not pd.api.types.is_numeric_dtype(chunk['quality']):
+            self._quality_as_names()
+        
+        for column in self.names:
+            self._store(column, self._intern(column, chunk[column]), start)
+        for column in self.NUMBER_COLUMNS:
+            if column in chunk and column not in self.names:
+                values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=np.float32)
+                self._store(column, values, start)
+        
+        self.size += len(chunk)
+        self.live = np.concatenate([self.live, np.ones(len(chunk), dtype=bool)])
+        self._code_index = None
+    
+    def update(self, row_ids, chunk):
+        """Overwrite the values of existing rows with those of a chunk, row for row"""
+        if 'quality' in chunk and not pd.api.types.is_numeric_dtype(chunk['quality']):
+            self._quality_as_names()
+        for column in self.names:
+            self._columns[column][row_ids] = self._intern(column, chunk[column])
+        for column in self.NUMBER_COLUMNS:
+            if column in chunk and column not in self.names and column in self._columns:
+                self._columns[column][row_ids] = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=np.float32)
+    
+    def remove(self, row_ids):
+        """Tombstone rows, so the ids of the other rows stay valid for the indexes"""
+        self.live[row_ids] = False
+    
+    def diff(self, new_df):
+        """Compare a fresh load of the collection with the model by code
+        
+        Returns (removed row ids, changed row ids, the changed rows' new values, added rows).
+        """
+        new_df = new_df.drop_duplicates('code', keep='last')
+        fresh = CardModel()
+        fresh.append(new_df)
+        
+        rows = self._find_codes(fresh.column('code'))
+        known = rows >= 0
+        old_rows = rows[known]
+        new_rows = np.flatnonzero(known)
+        
+        # Compare the names as text, since each model interns its own ids
+        changed = np.zeros(len(old_rows), dtype=bool)
+        for column in set(self.names) | set(fresh.names):
+            if column in self.names and column in fresh.names:
+                old_values = np.array(self.names[column], dtype=object)[self.column(column)[old_rows]]
+                new_values = np.array(fresh.names[column], dtype=object)[fresh.column(column)[new_rows]]
+                changed |= old_values != new_values
+            else:
+                changed[:] = True  # A column switched between text and numbers
+        for column in self.NUMBER_COLUMNS:
+            if column in self.names or column in fresh.names or not (self.has_column(column) and fresh.has_column(column)):
+                continue
+            old_values = self.column(column)[old_rows]
+            new_values = fresh.column(column)[new_rows]
+            changed |= (old_values != new_values) & ~(np.isnan(old_values) & np.isnan(new_values))
+        
+        gone = self.live.copy()
+        gone[old_rows] = False
+        removed = np.flatnonzero(gone)
+        return removed, old_rows[changed], new_df.iloc[new_rows[changed]], new_df.iloc[np.flatnonzero(~known)]
+    
+    def compact(self):
+        """Drop the spare room left for appends, once loading is done"""
+        for column, array in self._columns.items():
+            if len(array) > self.size:
+                self._columns[column] = array[:self.size].copy()
+    
+    def _store(self, column, values, start):
+        array = self._columns.get(column)
+        needed = start + len(values)
+        if array is None:
+            array = np.empty(needed, dtype=values.dtype)
+        else:
+            # Codes widen if a longer one shows up; arrays grow by doubling
+            dtype = np.promote_types(array.dtype, values.dtype)
+            if dtype != array.dtype or needed > len(array):
+                grown = np.empty(max(needed, 2 * len(array)), dtype=dtype)
+                grown[:start] = array[:start]
+                array = grown
+        array[start:needed] = values
+        self._columns[column] = array
+    
+    @staticmethod
+    def _encode_codes(values):
+        codes = values.fillna("").astype(str).to_numpy(dtype=object)
+        try:
+            return codes.astype(bytes)  # Karuta codes are ASCII, one byte per character
+        except UnicodeEncodeError:
+            return codes.astype(str)
+    
+    def _intern(self, column, values):
+        """Map values to int32 ids, adding names not seen before"""
+        codes, uniques = pd.factorize(values.fillna("").astype(str))
+        ids, names = self._name_ids[column], self.names[column]
+        table = np.empty(len(uniques), dtype=np.int32)
+        for i, name in enumerate(uniques):
+            name_id = ids.get(name)
+            if name_id is None:
+                name_id = ids[name] = len(names)
+                names.append(name)
+            table[i] = name_id
+        return table[codes]
+    
+    def _quality_as_names(self):
+        if 'quality' in self.names:
+            return
+        self.names['quality'], self._name_ids['quality'] = [], {}
+        if self.size:
+            # Qualities of the rows loaded so far become text too
+            loaded = pd.Series(self.column('quality')).map(lambda value: "" if np.isnan(value) else f"{value:g}")
+            self._columns['quality'] = self._intern('quality', loaded)
+    
+    def _text(self, value):
+        return value.decode("ascii") if isinstance(value, bytes) else str(value)
+    
+    def code_at(self, row_id):
+        return self._text(self._columns['code'][row_id])
+    
+    def name_at(self, column, row_id):
+        return self.names[column][self._columns[column][row_id]]
+    
+    def card(self, row_id):
+        """One card as a dict of display values"""
+        return {
+            'code': self.code_at(row_id),
+            'character': self.name_at('character', row_id),
+            'series': self.name_at('series', row_id),
+            'burnValue': float(self._columns['burnValue'][row_id])
+        }
+    
+    def rows_of(self, codes):
+        """Row ids of codes, -1 for codes that aren't loaded or were removed; the last row wins"""
+        return self._find_codes(self._encode_codes(pd.Series(codes, dtype=object)))
+    
+    def _find_codes(self, wanted):
+        keys = self.column('code')
+        if not len(wanted) or not self.size:
+            return np.full(len(wanted), -1, dtype=np.intp)
+        # Built and read as one tuple, since lookups also run outside cards_lock
+        code_index = self._code_index
+        if code_index is None:
+            code_order = np.argsort(keys, kind="stable")
+            code_index = self._code_index = code_order, keys[code_order]
+        code_order, sorted_codes = code_index
+        if wanted.dtype.kind != sorted_codes.dtype.kind:
+            # Byte and unicode codes only compare as text
+            wanted, sorted_codes = wanted.astype(str), sorted_codes.astype(str)
+        
+        positions = np.searchsorted(sorted_codes, wanted, side="right") - 1
+        found = (positions >= 0) & (sorted_codes[np.maximum(positions, 0)] == wanted)
+        row_ids = code_order[np.maximum(positions, 0)]
+        return np.where(found & self.live[row_ids], row_ids, -1)
+    
+    def row_of(self, code):
+        row_id = self.rows_of([code])[0]
+        return None if row_id < 0 else int(row_id)
+    
+    def rank(self, column):
+        """Integer sort rank of every row by one column; missing values rank lowest"""
+        values = self.column(column)
+        if column in self.names:
+            # Rank each distinct name once instead of every row
+            name_ranks, _ = pd.factorize(pd.Series(self.names[column], dtype=object).str.lower(), sort=True)
+            return name_ranks[values]
+        if values.dtype.kind == "f":
+            ranks, _ = pd.factorize(values, sort=True)
+            return ranks
+        _, ranks = np.unique(values, return_inverse=True)
+        return ranks
+    
+    def memory_usage(self):
+        """Bytes per column, including the interned names"""
+        usage = {column: array.nbytes for column, array in self._columns.items()}
+        for column, names in self.names.items():
+            usage[column] += (
+                sys.getsizeof(names) + sys.getsizeof(self._name_ids[column])
+                + sum(sys.getsizeof(name) for name in names)
+            )
+        code_index = self._code_index
+        if code_index is not None:
+            usage['code'] += sum(array.nbytes for array in code_index)
+        usage['code'] += self.live.nbytes
+        return usage
+    
+    def memory_report(self):
+        """Lines describing the memory used, compared to the same rows as a DataFrame"""
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        lines = [f"{self.live_count():,} cards in {total / 1e6:.1f} MB (about {self.source_bytes / 1e6:.1f} MB as a DataFrame)"]
+        for column, nbytes in usage.items():
+            detail = f", {len(self.names[column]):,} distinct" if column in self.names else f", {self._columns[column].dtype}"
+            lines.append(f"  {column}: {nbytes / 1e6:.2f} MB{detail}")
+        return lines
+
+class SortCache:
+    """Sort permutations for one dataset, computed on first use and reused until reload"""
+    
+    # Sort key label -> CSV column; keys whose column is missing are not offered
+    SORT_KEYS = {
+        "Burn Value": "burnValue",
+        "Quality": "quality",
+        "Series": "series",
+        "Character": "character",
+        "Code": "code",
+        "Print Number": "number"
+    }
+    
+    def __init__(self, cards):
+        self.cards = cards  # CardModel
+        self.keys = [key for key, col in self.SORT_KEYS.items() if cards.has_column(col)]
+        self._ranks = {}   # Sort key -> integer rank of every row
+        self._orders = {}  # Tuple of sort keys -> row ids, highest first
+        self._lock = threading.Lock()
+    
+    def _rank(self, key):
+        if key not in self._ranks:
+            # Missing values rank lowest and end up last in the default order
+            self._ranks[key] = self.cards.rank(self.SORT_KEYS[key])
+        return self._ranks[key]
+    
+    def order(self, keys):
+        """Row ids ordered highest first by keys, the first key being the primary one"""
+        keys = tuple(keys)
+        with self._lock:
+            if keys not in self._orders:
+                # lexsort treats its last key as the primary one
+                ascending = np.lexsort([self._rank(key) for key in reversed(keys)])
+                self._orders[keys] = ascending[::-1].copy()
+            return self._orders[keys]
+    
+    def sort_rows(self, row_ids, keys, ascending=False):
+        """Order a subset of row ids using the cached permutation"""
+        order = self.order(keys)
+        if len(row_ids) != len(order):
+            matched = np.zeros(len(order), dtype=bool)
+            matched[row_ids] = True
+            order = order[matched[order]]
+        
+        # Ascending is just the descending permutation read backwards
+        return order[::-1] if ascending else order
+
+class QueryError(ValueError):
+    """A filter query that can't be parsed or doesn't fit the loaded collection"""
+
+class CardQuery:
+    """A filter query compiled to NumPy masks over a CardModel
+        
+        burnValue >= 40 and series:'Naruto' and untagged
+        quality <= 1 and not tagged:wife
+        (character:rem or character:ram) and print < 1000
+    
+    field:text matches a substring of a name or code and field = text the whole value,
+    case-insensitively; words on their own match the character or series like Contains.
+    """
+    
+    # Query field -> CardModel column
+    FIELDS = {
+        "burnvalue": "burnValue", "burn": "burnValue", "bv": "burnValue",
+        "quality": "quality",
+        "number": "number", "print": "number",
+        "character": "character", "char": "character",
+        "series": "series",
+        "code": "code"
+    }
+    TAG_FIELDS = ("tagged", "tag")
+    OPERATORS = {
+        ">=": np.greater_equal, "<=": np.less_equal, ">": np.greater, "<": np.less,
+        "=": np.equal, "==": np.equal, "!=": np.not_equal
+    }
+    TOKEN_PATTERN = re.compile(r"""\s*(?:
+        (?P<paren>[()])
+      | (?P<op>>=|<=|!=|==|=|<|>|:)
+      | '(?P<squote>[^']*)'
+      | "(?P<dquote>[^"]*)"
+      | (?P<word>[^\s()<>=!:'"]+)
+    )""", re.VERBOSE)
+    MAX_PLANS = 256
+    _plans = {}  # Query text -> compiled query, shared by every collection
+    
+    def __init__(self, text):
+        self.text = text
+        self._tokens = self._tokenize(text)
+        self._pos = 0
+        if not self._tokens:
+            raise QueryError("Empty query")
+        self._plan = self._parse_or()
+        if self._pos < len(self._tokens):
+            raise QueryError(f"Unexpected '{self._tokens[self._pos][1]}'")
+        del self._tokens
+    
+    @classmethod
+    def compile(cls, text):
+        """The compiled query for text, parsed once per distinct query"""
+        text = text.strip()
+        query = cls._plans.get(text)
+        if query is None:
+            query = cls(text)
+            if len(cls._plans) >= cls.MAX_PLANS:
+                cls._plans.clear()
+            cls._plans[text] = query
+        return query
+    
+    def mask(self, cards, tags=None):
+        """Boolean mask of the live rows matching; tags maps tag name -> codes"""
+        return self._plan(cards, tags or {}) & cards.live
+    
+    def _tokenize(self, text):
+        tokens = []
+        pos = 0
+        while pos < len(text):
+            if text[pos:].isspace():
+                break
+            match = self.TOKEN_PATTERN.match(text, pos)
+            if match is None:
+                raise QueryError(f"Can't read the query from '{text[pos:].strip()}'")
+            kind = match.lastgroup
+            if kind in ("squote", "dquote"):
+                kind = "text"
+            tokens.append((kind, match.group(match.lastgroup)))
+            pos = match.end()
+        return tokens
+    
+    # Parsing, each rule returns a function of (cards, tags) giving a mask
+    
+    def _peek(self):
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else (None, None)
+    
+    def _take(self):
+        token = self._peek()
+        if token[0] is None:
+            raise QueryError("Query ends too early")
+        self._pos += 1
+        return token
+    
+    def _keyword(self, *words):
+        kind, value = self._peek()
+        return kind == "word" and value.lower() in words
+    
+    def _parse_or(self):
+        left = self._parse_and()
+        while self._keyword("or"):
+            self._pos += 1
+            right = self._parse_and()
+            left = lambda cards, tags, a=left, b=right: a(cards, tags) | b(cards, tags)
+        return left
+    
+    def _parse_and(self):
+        left = self._parse_not()
+        # Terms next to each other are joined with and
+        while self._peek()[0] is not None and self._peek() != ("paren", ")") and not self._keyword("or"):
+            if self._keyword("and"):
+                self._pos += 1
+            right = self._parse_not()
+            left = lambda cards, tags, a=left, b=right: a(cards, tags) & b(cards, tags)
+        return left
+    
+    def _parse_not(self):
+        if self._keyword("not"):
+            self._pos += 1
+            operand = self._parse_not()
+            return lambda cards, tags: ~operand(cards, tags)
+        if self._peek() == ("paren", "("):
+            self._pos += 1
+            inner = self._parse_or()
+            if self._take() != ("paren", ")"):
+                raise QueryError("Missing ')'")
+            return inner
+        return self._parse_term()
+    
+    def _parse_term(self):
+        kind, value = self._take()
+        if kind not in ("word", "text"):
+            raise QueryError(f"Unexpected '{value}'")
+        if kind == "word" and value.lower() in ("and", "or"):
+            raise QueryError(f"'{value}' needs a term on each side, quote it to search for the word")
+        
+        if self._peek()[0] == "op":
+            _, op = self._take()
+            value_kind, operand = self._take()
+            if value_kind not in ("word", "text"):
+                raise QueryError(f"Expected a value after '{value} {op}'")
+            return self._compare(value.lower(), op, operand)
+        if kind == "word" and value.lower() in ("tagged", "untagged"):
+            matcher = self._tag_matcher(None)
+            return matcher if value.lower() == "tagged" else lambda cards, tags: ~matcher(cards, tags)
+        return self._any_name(value.lower())
+    
+    def _compare(self, field, op, operand):
+        if field in self.TAG_FIELDS:
+            if op != ":" and op not in ("=", "=="):
+                raise QueryError("Tags can only be matched with ':'")
+            return self._tag_matcher(operand)
+        column = self.FIELDS.get(field)
+        if column is None:
+            raise QueryError(f"Unknown field '{field}', use one of: {', '.join(sorted(set(self.FIELDS)))}")
+        
+        needle = operand.lower()
+        if column in CardModel.NAME_COLUMNS or column == "code":
+            if op == ":":
+                return lambda cards, tags: self._text_mask(cards, column, needle)
+            if op not in ("=", "==", "!="):
+                raise QueryError(f"{column} holds text, match it with ':' or '='")
+            return self._exact_text(column, needle, op == "!=")
+        
+        try:
+            number = float(operand)
+        except ValueError:
+            number = None
+        if op == ":":
+            op = "="  # A number field with ':' is matched exactly
+        if number is None:
+            if op not in ("=", "==", "!="):
+                raise QueryError(f"'{operand}' isn't a number")
+            return self._exact_text(column, needle, op == "!=")
+        
+        compare = self.OPERATORS[op]
+        return lambda cards, tags: compare(self._numbers(cards, column), number)
+    
+    def _exact_text(self, column, needle, negate=False):
+        matcher = lambda cards, tags: self._text_mask(cards, column, needle, exact=True)
+        return matcher if not negate else lambda cards, tags: ~matcher(cards, tags)
+    
+    def _any_name(self, needle):
+        def matcher(cards, tags):
+            mask = np.zeros(cards.size, dtype=bool)
+            for column in cards.NAME_COLUMNS:
+                mask |= self._text_mask(cards, column, needle)
+            return mask
+        return matcher
+    
+    def _tag_matcher(self, tag):
+        def matcher(cards, tags):
+            if tag is None:
+                codes = set().union(*tags.values()) if tags else set()
+            else:
+                # Tag names are matched without case, like the rest of the query
+                found = [name for name in tags if name.lower() == tag.lower()]
+                if not found:
+                    raise QueryError(f"No tag named '{tag}'")
+                codes = tags[found[0]]
+            mask = np.zeros(cards.size, dtype=bool)
+            row_ids = cards.rows_of(list(codes))
+            mask[row_ids[row_ids >= 0]] = True
+            return mask
+        return matcher
+    
+    # Column access, done per distinct name for the interned columns
+    
+    @staticmethod
+    def _check_column(cards, column):
+        if not cards.has_column(column):
+            raise QueryError(f"The collection has no {column} column")
+    
+    @classmethod
+    def _text_mask(cls, cards, column, needle, exact=False):
+        cls._check_column(cards, column)
+        values = cards.column(column)
+        if column in cards.names:
+            names = cards.names[column]
+            if exact:
+                hits = np.fromiter((name.lower() == needle for name in names), dtype=bool, count=len(names))
+            else:
+                hits = np.fromiter((needle in name.lower() for name in names), dtype=bool, count=len(names))
+            return hits[values]
+        
+        if column == "code":
+            mask = np.zeros(cards.size, dtype=bool)
+            if exact:
+                # Codes are found through the model's sorted code index
+                row_ids = cards.rows_of([needle])
+                mask[row_ids[row_ids >= 0]] = True
+                return mask
+            if values.dtype.kind == "S":
+                try:
+                    return np.char.find(np.char.lower(values), needle.encode("ascii")) >= 0
+                except UnicodeEncodeError:
+                    return mask  # A byte array only holds ASCII codes
+            return np.char.find(np.char.lower(values), needle) >= 0
+        raise QueryError(f"{column} holds numbers, compare it with one")
+    
+    @classmethod
+    def _numbers(cls, cards, column):
+        cls._check_column(cards, column)
+        values = cards.column(column)
+        if column in cards.names:
+            # Text qualities compare by their numeric value where they have one
+            name_values = pd.to_numeric(pd.Series(cards.names[column], dtype=object), errors='coerce').to_numpy(dtype=np.float32)
+            return name_values[values]
+        if values.dtype.kind != "f":
+            raise QueryError(f"{column} isn't a number column")
+        return values
+
+class CsvCache:
+    """Binary copies of parsed collection CSVs, reused while the file is unchanged"""
+    
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or get_cache_dir("csv")
+        self.extension = ".feather" if HAS_PYARROW else ".pkl"
+    
+    @staticmethod
+    def file_digest(filepath):
+        """Hash the file contents, much cheaper than parsing them"""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _paths(self, filepath):
+        key = hashlib.sha1(os.path.abspath(filepath).encode("utf-8")).hexdigest()[:20]
+        base = os.path.join(self.cache_dir, key)
+        return base + self.extension, base + ".json"
+    
+    def load(self, filepath, digest):
+        """Return (cards_df, meta) for an unchanged file, or None"""
+        data_path, meta_path = self._paths(filepath)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            stat = os.stat(filepath)
+            if meta["size"] != stat.st_size or meta["digest"] != digest:
+                return None
+            
+            if HAS_PYARROW:
+                cards_df = pd.read_feather(data_path)
+            else:
+                cards_df = pd.read_pickle(data_path)
+            
+            # Same contents with a new mtime (e.g. a re-download) is still a hit
+            if meta["mtime"] != stat.st_mtime_ns:
+                meta["mtime"] = stat.st_mtime_ns
+                self._write_meta(meta_path, meta)
+            return cards_df, meta
+        except (OSError, ValueError, KeyError):
+            return None
+        except Exception as e:
+            print(f"CSV cache read error: {str(e)}")
+            return None
+    
+    def store(self, filepath, digest, cards_df, **extra):
+        """Save a parsed file next to the metadata that identifies its source"""
+        data_path, meta_path = self._paths(filepath)
+        try:
+            stat = os.stat(filepath)
+            temp_path = data_path + ".tmp"
+            if HAS_PYARROW:
+                cards_df.reset_index(drop=True).to_feather(temp_path)
+            else:
+                cards_df.to_pickle(temp_path)
+            os.replace(temp_path, data_path)
+            
+            meta = {
+                "path": os.path.abspath(filepath),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "digest": digest
+            }
+            meta.update(extra)
+            self._write_meta(meta_path, meta)
+        except Exception as e:
+            print(f"CSV cache write error: {str(e)}")
+    
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        temp_path = meta_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, meta_path)
+
+class SearchResultCache:
+    """Ranked image URLs per search, persisted in SQLite with a TTL and LRU eviction"""
+    
+    DEFAULT_TTL = 14 * 24 * 3600  # Seconds before a stored search is redone
+    DEFAULT_MAX_ENTRIES = 5000
+    
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path or os.path.join(get_cache_dir("search"), "results.sqlite3")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        
+        # One connection shared by the search threads, serialized by the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_results ("
+                "key TEXT PRIMARY KEY, urls TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS search_results_accessed ON search_results (accessed)"
+            )
+    
+    @staticmethod
+    def make_key(char_name, series_name, query):
+        """Normalize case and whitespace so equivalent searches share an entry"""
+        return "|".join(" ".join(str(part).lower().split()) for part in (char_name, series_name, query))
+    
+    def get(self, key):
+        """Return the cached URL list, or None if missing or expired"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT urls, created FROM search_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            urls, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM search_results WHERE key = ?", (key,))
+                return None
+            
+            self._conn.execute("UPDATE search_results SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(urls)
+    
+    def put(self, key, urls):
+        """Store a URL list and evict the least recently used entries over the cap"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (key, urls, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(list(urls)), now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM search_results WHERE key IN ("
+                "SELECT key FROM search_results ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+class HttpClient:
+    """Shared HTTP layer: pooled keep-alive sessions, retries with backoff and split timeouts"""
+    
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    
+    # Headers to mimic a browser
+    SEARCH_HEADERS = {
+        'User-Agent': USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5'
+    }
+    IMAGE_HEADERS = {
+        'User-Agent': USER_AGENT,
+        'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+        'Referer': 'https://www.google.com/'
+    }
+    
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.5, backoff_max=4,
+                 per_host=4):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.per_host = per_host
+        
+        # Idle sessions; each keeps its connections alive between requests
+        self._sessions = queue.LifoQueue()
+        # Caps concurrent requests per host across all sessions
+        self._host_slots = {}
+        self._lock = threading.Lock()
+    
+    def _retry_policy(self):
+        options = dict(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False
+        )
+        try:
+            return Retry(backoff_max=self.backoff_max, **options)
+        except TypeError:
+            # urllib3 < 2 takes the cap as a class attribute
+            retry = Retry(**options)
+            retry.BACKOFF_MAX = self.backoff_max
+            return retry
+    
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.per_host, max_retries=self._retry_policy())
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def _host_slot(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+    
+    def request(self, method, url, headers=None, **kwargs):
+        """Send a request on a pooled session
+        
+        A streamed response keeps its session and host slot until it is closed,
+        so its body reads count against the per-host limit too.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            session = self._sessions.get_nowait()
+        except queue.Empty:
+            session = self._new_session()
+        slot = self._host_slot(url)
+        slot.acquire()
+        try:
+            response = session.request(method, url, headers=headers, **kwargs)
+        except BaseException:
+            self._release(slot, session)
+            raise
+        if not kwargs.get("stream"):
+            self._release(slot, session)
+            return response
+        
+        # Hand the session and slot back once, however often the response is closed
+        close = response.close
+        released = []
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self._release(slot, session)
+        response.close = close_and_release
+        return response
+    
+    def _release(self, slot, session):
+        slot.release()
+        self._sessions.put(session)
+    
+    def get(self, url, headers=None, **kwargs):
+        return self.request("GET", url, headers=headers, **kwargs)
+    
+    def head(self, url, headers=None, **kwargs):
+        return self.request("HEAD", url, headers=headers, **kwargs)
+
+# Image search endpoints; {query} is replaced with the URL-encoded query
+SEARCH_PROVIDERS = {
+    "google": "https://www.google.com/search?q={query}&tbm=isch",
+    "bing": "https://www.bing.com/images/search?q={query}&form=HDRSC2&first=1"
+}
+
+class ResultPageExtractor:
+    """Pulls candidate image URLs out of a search result page in one pass"""
+    
+    # Alternatives are tried left to right at each position of the page
+    PAGE_PATTERN = re.compile(
+        r'<img\b[^>]*?\ssrc=["\']([^"\']+)["\']'          # <img src="...">
+        r'|murl&quot;:\s*&quot;(http.*?)&quot;'            # Bing's full-size URL in the m attribute
+        r'|<script\b[^>]*>(.*?)</script>',                # Script bodies, scanned with SCRIPT_PATTERN
+        re.IGNORECASE | re.DOTALL
+    )
+    # Google's original-image JSON field and plain image links, only looked for in scripts
+    SCRIPT_PATTERN = re.compile(
+        r'"ou":"(http[^"]+)"|(https?://[^\s"\'<>]+\.(?:jpg|jpeg|png|gif))',
+        re.IGNORECASE
+    )
+    BACKENDS = ("regex", "lxml")
+    
+    def __init__(self, backend=None):
+        # lxml walks the page faster when it is installed
+        if backend is None or (backend == "lxml" and not HAS_LXML):
+            backend = "lxml" if HAS_LXML else "regex"
+        self.backend = backend
+    
+    def extract(self, page):
+        """Return the image URLs in page order, without duplicates or SVGs"""
+        if self.backend == "lxml":
+            raw_urls = self._scan_lxml(page)
+        else:
+            raw_urls = self._scan_regex(page)
+        
+        image_urls = []
+        seen = set()
+        for url in raw_urls:
+            if url.startswith('//'):
+                url = 'https:' + url
+            if url in seen or url.lower().endswith('.svg'):
+                continue
+            seen.add(url)
+            image_urls.append(url)
+        return image_urls
+    
+    def _scan_regex(self, page):
+        for img_src, bing_full, script in self.PAGE_PATTERN.findall(page):
+            if img_src:
+                if 'http' in img_src or '//' in img_src:
+                    yield html_lib.unescape(img_src)
+            elif bing_full:
+                yield html_lib.unescape(bing_full)
+            else:
+                for original, direct in self.SCRIPT_PATTERN.findall(script):
+                    yield original or direct
+    
+    def _scan_lxml(self, page):
+        for element in lxml.html.fromstring(page).iter('img', 'script', 'a'):
+            if element.tag == 'img':
+                src = element.get('src') or ''
+                if 'http' in src or '//' in src:
+                    yield src
+            elif element.tag == 'script':
+                for original, direct in self.SCRIPT_PATTERN.findall(element.text or ''):
+                    yield original or direct
+            elif element.get('m'):
+                try:
+                    bing_full = json.loads(element.get('m')).get('murl')
+                except ValueError:
+                    continue
+                if bing_full:
+                    yield bing_full
+
+class SearchFailed(Exception):
+    """No search provider answered, so an empty result says nothing about the card"""
+
+class ImageSearcher:
+    """Queries all search providers concurrently and merges their image URLs"""
+    
+    def __init__(self, http, providers=None, deadline=12, workers=6, extractor=None):
+        self.http = http
+        self.providers = dict(providers or SEARCH_PROVIDERS)
+        self.extractor = extractor or ResultPageExtractor()
+        self.deadline = deadline  # Seconds for the whole search, not per request
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+    
+    def shutdown(self):
+        shutdown_executor(self._executor)
+    
+    @staticmethod
+    def build_queries(char_name, series_name):
+        return [
+            f"{char_name} {series_name}",  # Basic query
+            f"{char_name} {series_name} anime character",  # Specify anime character
+            f"{char_name} from {series_name}"  # Alternative format
+        ]
+    
+    def search_requests(self, char_name, series_name):
+        """(provider, query) pairs to run for one card"""
+        queries = self.build_queries(char_name, series_name)
+        requests_to_run = [("google", queries[0]), ("bing", queries[0]), ("google", queries[1])]
+        return [(provider, query) for provider, query in requests_to_run if provider in self.providers]
+    
+    def search(self, char_name, series_name, on_results=None):
+        """Return the merged URLs, calling on_results(new_urls) as each provider answers
+        
+        Raises SearchFailed when no provider answered, e.g. all of them were
+        unreachable or rate limited, rather than returning an empty list.
+        """
+        started = time.time()
+        futures = {
+            self._executor.submit(self._fetch, provider, query, started): (provider, query)
+            for provider, query in self.search_requests(char_name, series_name)
+        }
+        
+        merged = []
+        seen = set()
+        answered = 0
+        last_error = None
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                provider, query = futures[future]
+                try:
+                    urls = self.filter_urls(future.result())
+                except Exception as e:
+                    print(f"{provider.title()} search error ({query}): {str(e)}")
+                    last_error = e
+                    continue
+                answered += 1
+                
+                new_urls = [url for url in urls if url not in seen]
+                seen.update(new_urls)
+                merged.extend(new_urls)
+                if new_urls and on_results is not None:
+                    on_results(new_urls)
+        except FutureTimeoutError:
+            print(f"Search deadline reached for {char_name} ({series_name})")
+            for future in futures:
+                future.cancel()
+            if not answered:
+                last_error = f"no answer within {self.deadline}s"
+        if not answered:
+            raise SearchFailed(f"No search provider answered: {last_error}")
+        return merged
+    
+    def _fetch(self, provider, query, started):
+        # Requests never outlive the overall deadline
+        remaining = max(1.0, self.deadline - (time.time() - started))
+        search_url = self.providers[provider].format(query=urllib.parse.quote(query))
+        response = self.http.get(
+            search_url,
+            headers=HttpClient.SEARCH_HEADERS,
+            timeout=(self.http.timeout[0], remaining)
+        )
+        if response.status_code != 200:
+            # A rate limit or captcha page, not a search without results
+            raise SearchFailed(f"HTTP {response.status_code}")
+        return self.extractor.extract(response.text)
+    
+    @staticmethod
+    def filter_urls(image_urls):
+        """Filter out small images, icons, etc."""
+        filtered_urls = []
+        for url in image_urls:
+            # Skip likely non-image resources
+            if any(skip in url.lower() for skip in ['icon', 'logo', 'button', 'emoji', 'spinner', 'transparent']):
+                continue
+            # Skip SVGs
+            if url.lower().endswith('.svg'):
+                continue
+            # Skip very small URLs (likely thumbnails/icons)
+            if 'w=32' in url or 'w=16' in url or 'width=32' in url or 'width=16' in url:
+                continue
+            
+            filtered_urls.append(url)
+        return filtered_urls
+
+class ImageCache:
+    """Downloaded image bytes stored by content hash, with per-URL metadata in SQLite"""
+    
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    BAD_TTL = 7 * 24 * 3600  # Seconds a bad URL is skipped before it is tried again
+    
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or get_cache_dir("images")
+        self.blob_dir = os.path.join(self.cache_dir, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite3"), check_same_thread=False)
+        with self._lock, self._conn:
+            # One row per URL; bad URLs keep their status so they aren't fetched again
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                "url TEXT PRIMARY KEY, digest TEXT, status TEXT NOT NULL, reason TEXT, "
+                "content_type TEXT, width INTEGER, height INTEGER, accessed REAL NOT NULL, phash TEXT)"
+            )
+            # Caches created before perceptual hashes were stored lack the column
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(urls)")}
+            if "phash" not in columns:
+                self._conn.execute("ALTER TABLE urls ADD COLUMN phash TEXT")
+            # One row per distinct image, shared by every URL serving the same bytes
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_accessed ON blobs (accessed)")
+            # Hosts get fixed and links come back, so bad URLs are only remembered for a while
+            self._conn.execute("DELETE FROM urls WHERE status = 'bad' AND accessed < ?", (time.time() - self.BAD_TTL,))
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+    
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+    
+    def lookup(self, url):
+        """Return what is known about a URL as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, status, reason, content_type, width, height, phash, accessed FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row[1] == "bad" and row[7] < time.time() - self.BAD_TTL:
+            return None  # Expired, the URL gets another try
+        keys = ("digest", "status", "reason", "content_type", "width", "height", "phash")
+        return dict(zip(keys, row))
+    
+    def read(self, url):
+        """Return the cached bytes for a good URL, or None"""
+        info = self.lookup(url)
+        if info is None or info["status"] != "ok" or not info["digest"]:
+            return None
+        try:
+            with open(self._blob_path(info["digest"]), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE urls SET accessed = ? WHERE url = ?", (now, url))
+            self._conn.execute("UPDATE blobs SET accessed = ? WHERE digest = ?", (now, info["digest"]))
+        return data
+    
+    def hashes(self, urls):
+        """Return {url: (phash, width, height)} for the good URLs among urls that have been hashed"""
+        urls = list(dict.fromkeys(urls))
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's limit on query parameters
+            for start in range(0, len(urls), 500):
+                batch = urls[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT url, phash, width, height FROM urls "
+                    f"WHERE status = 'ok' AND phash IS NOT NULL AND url IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                found.update((url, (phash, width, height)) for url, phash, width, height in rows)
+        return found
+    
+    def put(self, url, data, content_type, width, height, phash=None):
+        """Store the bytes of a usable image, sharing storage with identical images"""
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            blob_path = self._blob_path(digest)
+            known = self._conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if known is None:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                temp_path = blob_path + ".tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, blob_path)
+                self._total_bytes += len(data)
+            
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (digest, size, accessed) VALUES (?, ?, ?)",
+                    (digest, len(data), now)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO urls (url, digest, status, reason, content_type, width, height, accessed, phash) "
+                    "VALUES (?, ?, 'ok', NULL, ?, ?, ?, ?, ?)",
+                    (url, digest, content_type, width, height, now, phash)
+                )
+            self._evict()
+        return digest
+    
+    def mark_bad(self, url, reason, content_type=None, width=None, height=None):
+        """Remember that a URL isn't a usable image so it is skipped next time"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url, digest, status, reason, content_type, width, height, accessed) "
+                "VALUES (?, NULL, 'bad', ?, ?, ?, ?, ?)",
+                (url, reason, content_type, width, height, time.time())
+            )
+    
+    def _evict(self):
+        """Drop the least recently used images until the cache fits its size cap"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT digest, size FROM blobs ORDER BY accessed").fetchall()
+        with self._conn:
+            for digest, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+                self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+                self._total_bytes -= size
+
+class DuplicateFilter:
+    """Finds search results that show the same picture at another URL or size"""
+    
+    HASH_SIZE = 8  # 8x8 difference hash, 64 bits
+    
+    def __init__(self, threshold=6):
+        self.threshold = threshold  # Max differing bits for two images to count as the same
+    
+    @classmethod
+    def image_hash(cls, image):
+        """Difference hash of an image, as 16 hex digits"""
+        small = image.convert('L').resize((cls.HASH_SIZE + 1, cls.HASH_SIZE), Image.BILINEAR)
+        pixels = np.asarray(small, dtype=np.int16)
+        return np.packbits(pixels[:, 1:] > pixels[:, :-1]).tobytes().hex()
+    
+    def duplicates(self, urls, hashes):
+        """URLs with a near-identical, larger result; hashes maps url -> (phash, width, height)"""
+        hashed = [url for url in dict.fromkeys(urls) if url in hashes]
+        
+        # Largest first, so each group keeps its highest resolution member
+        hashed.sort(key=lambda url: hashes[url][1] * hashes[url][2], reverse=True)
+        kept = []
+        duplicate_urls = set()
+        for url in hashed:
+            value = int(hashes[url][0], 16)
+            if any(bin(value ^ kept_value).count("1") <= self.threshold for kept_value in kept):
+                duplicate_urls.add(url)
+            else:
+                kept.append(value)
+        return duplicate_urls
+
+class UnusableImage(Exception):
+    """A URL that definitely doesn't give a usable image, unlike a network or server error"""
+
+class ImageFetcher:
+    """Downloads and validates candidate images, going through the image cache"""
+    
+    MIN_SIZE = 100  # Smaller images are likely icons
+    PROBE_BYTES = 64 * 1024  # Enough for the header of nearly every JPEG/PNG/GIF/WebP
+    
+    # Handle different versions of PIL/Pillow
+    if hasattr(Image, 'Resampling'):
+        RESAMPLE = Image.Resampling.LANCZOS
+    else:
+        RESAMPLE = Image.LANCZOS if hasattr(Image, 'LANCZOS') else Image.ANTIALIAS
+    
+    def __init__(self, http, image_cache=None):
+        self.http = http
+        self.image_cache = image_cache
+    
+    def fetch(self, image_url, fit_size=None):
+        """Return (image, width, height) for a usable image, raising otherwise
+        
+        With a fit_size the image is decoded at reduced scale and resized to fit it.
+        The width and height returned are always those of the original image.
+        """
+        # Skip URLs already known not to be usable images
+        cached_info = self.image_cache.lookup(image_url) if self.image_cache is not None else None
+        if cached_info is not None and cached_info["status"] == "bad":
+            raise UnusableImage(f"Skipping known bad image: {cached_info['reason']}")
+        
+        # Reuse the bytes if this image was downloaded before
+        image_data = self.image_cache.read(image_url) if cached_info is not None else None
+        downloaded = image_data is None
+        if downloaded:
+            # Download the image with timeout and headers
+            response = self.http.get(image_url, headers=HttpClient.IMAGE_HEADERS)
+            
+            # Rate limits and server errors pass, so only a missing image is remembered
+            if response.status_code in (404, 410):
+                self.mark_bad(image_url, f"HTTP {response.status_code}")
+                raise UnusableImage(f"Image not found: HTTP {response.status_code}")
+            if not 200 <= response.status_code < 300:
+                raise Exception(f"Image request failed: HTTP {response.status_code}")
+            
+            # Check if we actually got an image
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.startswith('image/'):
+                self.mark_bad(image_url, f"non-image content: {content_type}", content_type)
+                raise UnusableImage(f"URL returned non-image content: {content_type}")
+            
+            image_data = response.content
+        else:
+            content_type = cached_info["content_type"]
+        
+        # Open the image, this only reads the header
+        try:
+            image = Image.open(io.BytesIO(image_data))
+        except Exception as e:
+            self.mark_bad(image_url, f"undecodable image: {str(e)}", content_type)
+            raise UnusableImage(f"Undecodable image: {str(e)}") from e
+        
+        img_width, img_height = image.size
+        
+        # Skip if image is too small (likely an icon)
+        if img_width < self.MIN_SIZE or img_height < self.MIN_SIZE:
+            self.mark_bad(image_url, "too small", content_type, img_width, img_height)
+            raise UnusableImage("Image too small, skipping to next")
+        
+        try:
+            image = self._decode(image, fit_size)
+        except Exception as e:
+            self.mark_bad(image_url, f"undecodable image: {str(e)}", content_type, img_width, img_height)
+            raise UnusableImage(f"Undecodable image: {str(e)}") from e
+        
+        # Keep the bytes, with a perceptual hash for spotting duplicate results
+        if self.image_cache is not None and (downloaded or not cached_info["phash"]):
+            phash = DuplicateFilter.image_hash(image)
+            self.image_cache.put(image_url, image_data, content_type, img_width, img_height, phash)
+        
+        return image, img_width, img_height
+    
+    def probe(self, image_url):
+        """Check content type and dimensions from the first few KB, returning (usable, reason)
+        
+        Only a definite problem makes a URL unusable; when the header doesn't fit in
+        PROBE_BYTES the full download decides.
+        """
+        cached_info = self.image_cache.lookup(image_url) if self.image_cache is not None else None
+        if cached_info is not None:
+            return cached_info["status"] != "bad", cached_info["reason"]
+        
+        # Ask for just the start of the file, and stop reading early if the server sends it all
+        headers = dict(HttpClient.IMAGE_HEADERS, Range=f"bytes=0-{self.PROBE_BYTES - 1}")
+        try:
+            response = self.http.get(image_url, headers=headers, stream=True)
+        except requests.RequestException:
+            return True, None  # Possibly a passing network problem, the download decides
+        
+        try:
+            if response.status_code in (408, 429) or response.status_code >= 500:
+                return True, None
+            if response.status_code >= 400:
+                return False, f"HTTP {response.status_code}"
+            
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.startswith('image/'):
+                self.mark_bad(image_url, f"non-image content: {content_type}", content_type)
+                return False, f"non-image content: {content_type}"
+            
+            # A file known to be larger than the probe only needs its header read;
+            # otherwise reading on may get the whole file, which is then kept
+            total = self._content_size(response)
+            header_only = total is not None and total > self.PROBE_BYTES
+            
+            parser = ImageFile.Parser()
+            chunks = []
+            received = 0
+            complete = False
+            for chunk in response.iter_content(8192):
+                if parser.image is None:
+                    parser.feed(chunk)
+                chunks.append(chunk)
+                received += len(chunk)
+                if (header_only and parser.image is not None) or received >= self.PROBE_BYTES:
+                    break
+            else:
+                complete = total is None or received >= total
+                # The whole file arrived without a readable header
+                if complete and parser.image is None:
+                    try:
+                        parser.close()
+                    except Exception as e:
+                        self.mark_bad(image_url, f"undecodable image: {str(e)}", content_type)
+                        return False, f"undecodable image: {str(e)}"
+        except requests.RequestException:
+            return True, None
+        finally:
+            response.close()
+        
+        if parser.image is not None:
+            img_width, img_height = parser.image.size
+            if img_width < self.MIN_SIZE or img_height < self.MIN_SIZE:
+                self.mark_bad(image_url, "too small", content_type, img_width, img_height)
+                return False, "too small"
+            
+            # Small files arrive whole, so keep them like a full download
+            if complete and self.image_cache is not None:
+                image_data = b"".join(chunks)
+                try:
+                    image = self._decode(Image.open(io.BytesIO(image_data)), None)
+                    phash = DuplicateFilter.image_hash(image)
+                    self.image_cache.put(image_url, image_data, content_type, img_width, img_height, phash)
+                except Exception as e:
+                    self.mark_bad(image_url, f"undecodable image: {str(e)}", content_type, img_width, img_height)
+                    return False, f"undecodable image: {str(e)}"
+        return True, None
+    
+    @staticmethod
+    def _content_size(response):
+        """Size of the whole file from Content-Range or Content-Length, None if not given"""
+        content_range = response.headers.get('Content-Range', '')
+        match = re.match(r"bytes \d+-\d+/(\d+)", content_range)
+        if match:
+            return int(match.group(1))
+        length = response.headers.get('Content-Length')
+        if response.status_code == 200 and length and length.isdigit():
+            return int(length)
+        return None
+    
+    def _decode(self, image, fit_size):
+        """Decode an opened image as RGB/RGBA, scaled to fit fit_size if given"""
+        if fit_size is None:
+            image.load()
+        else:
+            img_width, img_height = image.size
+            ratio = min(fit_size[0]/img_width, fit_size[1]/img_height)
+            new_size = (max(int(img_width * ratio), 1), max(int(img_height * ratio), 1))
+            
+            # JPEGs can decode straight at 1/2, 1/4 or 1/8 scale, so a large photo
+            # is never fully decoded; keep twice the target size for the final resize
+            if ratio < 0.5:
+                image.draft('RGB', (new_size[0] * 2, new_size[1] * 2))
+            image.load()
+        
+        # Ensure we have a standard RGB/RGBA image
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        
+        if fit_size is not None and image.size != new_size:
+            # Cheap box reduction first, then LANCZOS over the last factor of two
+            try:
+                image = image.resize(new_size, self.RESAMPLE, reducing_gap=2.0)
+            except TypeError:
+                # Pillow before 7.0 has no reducing_gap
+                image = image.resize(new_size, self.RESAMPLE)
+        return image
+    
+    def mark_bad(self, image_url, reason, content_type=None, width=None, height=None):
+        """Record an unusable image URL in the image cache"""
+        if self.image_cache is not None:
+            self.image_cache.mark_bad(image_url, reason, content_type, width, height)
+
+class CandidateValidator:
+    """Probes search results concurrently so unusable ones are skipped without downloading them"""
+    
+    def __init__(self, probe, workers=4, window=8):
+        self.probe = probe    # Called on a worker as probe(url) -> (usable, reason)
+        self.window = window  # How many upcoming results to probe
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="probe")
+        self._probes = {}     # url -> Future
+        self._rejected = {}   # url -> reason, from probes or failed downloads
+        self._lock = threading.Lock()
+    
+    def shutdown(self):
+        shutdown_executor(self._executor)
+    
+    def reset(self):
+        """Forget the probes and rejections of the previous search"""
+        with self._lock:
+            for future in self._probes.values():
+                future.cancel()
+            self._probes.clear()
+            self._rejected.clear()
+    
+    def probe_ahead(self, urls):
+        """Start probing the first window urls that haven't been probed yet"""
+        with self._lock:
+            for url in urls[:self.window]:
+                if url not in self._probes and url not in self._rejected:
+                    self._probes[url] = self._executor.submit(self._run_probe, url)
+    
+    def _run_probe(self, url):
+        try:
+            usable, reason = self.probe(url)
+        except Exception as e:
+            print(f"Probe error ({url}): {str(e)}")
+            return True, None  # Let the download decide
+        if not usable:
+            self.reject(url, reason)
+        return usable, reason
+    
+    def reject(self, url, reason):
+        """Record an unusable URL, e.g. one whose full download failed"""
+        with self._lock:
+            self._rejected[url] = reason
+    
+    def check(self, url):
+        """Wait for url's probe if there is one; URLs never probed count as usable"""
+        with self._lock:
+            future = self._probes.get(url)
+        if future is None or future.cancelled():
+            return True, None
+        return future.result()
+    
+    def next_candidate(self, urls, start, skip=()):
+        """Index of the first URL from start, wrapping around, not known to be unusable or in skip"""
+        with self._lock:
+            for offset in range(len(urls)):
+                index = (start + offset) % len(urls)
+                if urls[index] not in self._rejected and urls[index] not in skip:
+                    return index
+        return None
+
+class ImagePrefetcher:
+    """Worker pool that downloads and decodes images, including the upcoming results"""
+    
+    def __init__(self, prepare, workers=3, depth=3):
+        self.prepare = prepare  # Called on a worker as prepare(url, frame_size)
+        self.depth = depth      # How many results ahead to prepare
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._futures = {}      # (url, frame_size) -> Future
+        self._lock = threading.Lock()
+    
+    def prefetch(self, urls, frame_size):
+        """Start preparing urls, dropping prefetches that are no longer upcoming"""
+        wanted = [(url, frame_size) for url in urls[:self.depth]]
+        with self._lock:
+            for key in list(self._futures):
+                if key not in wanted:
+                    self._futures.pop(key).cancel()
+            for key in wanted:
+                if key not in self._futures:
+                    self._futures[key] = self._executor.submit(self.prepare, *key)
+    
+    def take(self, url, frame_size):
+        """Return the Future preparing url, or None if it wasn't prefetched"""
+        with self._lock:
+            return self._futures.pop((url, frame_size), None)
+    
+    def submit(self, url, frame_size):
+        """Return a Future preparing url, reusing a prefetch when there is one"""
+        future = self.take(url, frame_size)
+        if future is None or future.cancelled():
+            future = self._executor.submit(self.prepare, url, frame_size)
+        return future
+    
+    def reset(self):
+        """Forget all prefetches, e.g. when another card is selected"""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+    
+    def shutdown(self):
+        self.reset()
+        shutdown_executor(self._executor)
+
+class CollectionLoader:
+    """Streams a collection CSV in chunks on a worker thread"""
+    
+    # Only the columns the app uses are read, with explicit dtypes
+    COLUMN_DTYPES = {
+        'code': 'object',
+        'character': 'object',
+        'series': 'object',
+        'tag': 'object',
+        'quality': 'object',  # Converted per chunk, some exports use text here
+        'burnValue': 'float64',
+        'number': 'float64'
+    }
+    REQUIRED_COLUMNS = ['character', 'series', 'code', 'quality', 'burnValue']
+    CHUNK_SIZE = 20000
+    
+    def __init__(self, filepath, chunk_size=CHUNK_SIZE, cache=None):
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+        self.cache = cache  # Optional CsvCache
+        self.from_cache = False
+        self.columns = self.read_header(filepath)
+        self.filter_tags = 'tag' in self.columns
+        self.quality_numeric = True
+        self.rows_read = 0
+        self.messages = queue.Queue()
+        self._cancelled = threading.Event()
+    
+    @staticmethod
+    def read_header(filepath):
+        """Return the column names without parsing any rows"""
+        return list(pd.read_csv(filepath, nrows=0).columns)
+    
+    def missing_columns(self):
+        return [col for col in self.REQUIRED_COLUMNS if col not in self.columns]
+    
+    def iter_chunks(self):
+        """Yield the cards in chunks, from the cache when the file is unchanged"""
+        if self.cache is None:
+            yield from self._parse_chunks()
+            return
+        
+        digest = CsvCache.file_digest(self.filepath)
+        cached = self.cache.load(self.filepath, digest)
+        if cached is not None:
+            cards_df, meta = cached
+            self.from_cache = True
+            self.rows_read = meta["rows_read"]
+            self.quality_numeric = meta["quality_numeric"]
+            yield cards_df
+            return
+        
+        parsed = []
+        for chunk in self._parse_chunks():
+            parsed.append(chunk)
+            yield chunk
+        
+        if not self._cancelled.is_set() and parsed:
+            self.cache.store(
+                self.filepath, digest, pd.concat(parsed, ignore_index=True),
+                rows_read=self.rows_read, quality_numeric=self.quality_numeric
+            )
+    
+    def _parse_chunks(self):
+        """Yield parsed chunks, keeping only the rows whose tag is empty"""
+        reader = pd.read_csv(
+            self.filepath,
+            usecols=lambda col: col in self.COLUMN_DTYPES,
+            dtype=self.COLUMN_DTYPES,
+            chunksize=self.chunk_size
+        )
+        with reader:
+            for chunk in reader:
+                if self._cancelled.is_set():
+                    return
+                self.rows_read += len(chunk)
+                
+                # Filter to only rows where tag is empty (NaN, None, or empty string)
+                if self.filter_tags:
+                    chunk = chunk[chunk['tag'].isna() | (chunk['tag'] == '')]
+                
+                # Convert quality to numeric, remembering if any chunk couldn't be
+                try:
+                    chunk = chunk.assign(quality=pd.to_numeric(chunk['quality']))
+                except (ValueError, TypeError):
+                    self.quality_numeric = False
+                
+                yield chunk
+    
+    def read_all(self):
+        """Load the whole file on the calling thread"""
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return pd.DataFrame(columns=[col for col in self.columns if col in self.COLUMN_DTYPES])
+        return pd.concat(chunks, ignore_index=True)
+    
+    def start(self):
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+    
+    def cancel(self):
+        self._cancelled.set()
+    
+    def _run(self):
+        try:
+            for chunk in self.iter_chunks():
+                self.messages.put(("chunk", chunk))
+            self.messages.put(("done", None))
+        except Exception as e:
+            self.messages.put(("error", e))
+
+class TagStore:
+    """Card tags for one collection, journaled to disk so a session survives a crash"""
+    
+    def __init__(self, tag_names, journal_dir=None):
+        self.journal_dir = journal_dir or get_cache_dir("tags")
+        self.csv_path = None  # Collection the tags belong to
+        self.journal_path = None
+        # tag -> {code: None}; a dict keeps the order cards were tagged in
+        self.tags = {name: {} for name in tag_names}
+        self.latest = {}  # code -> tag it was given last, what write-back stores
+        self._journal = None
+    
+    def open(self, csv_path):
+        """Switch to a collection's journal, replaying the tags recorded in it"""
+        self.close()
+        self.csv_path = csv_path
+        key = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:20]
+        self.journal_path = os.path.join(self.journal_dir, key + ".jsonl")
+        for cards in self.tags.values():
+            cards.clear()
+        self.latest.clear()
+        
+        entries = 0
+        line = "\n"
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut off by a crash
+                    entries += 1
+                    if entry.get("op") == "add" and entry.get("tag") in self.tags:
+                        self._add(entry["tag"], entry["code"])
+                    elif entry.get("op") == "clear":
+                        self._clear()
+        
+        # Rewrite the journal once it is mostly cleared or repeated entries
+        live = sum(len(cards) for cards in self.tags.values()) + len(self.latest)
+        if entries > 2 * live + 100:
+            self._compact()
+            line = "\n"
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if not line.endswith("\n"):
+            self._journal.write("\n")  # Keep new entries off a line cut off by a crash
+        return len(self.latest)
+    
+    def move_to(self, csv_path):
+        """Follow a newer export of the same collection, carrying the current tags over"""
+        memberships = [(tag, code) for tag, cards in self.tags.items() for code in cards]
+        latest = list(self.latest.items())
+        self.open(csv_path)
+        if self.latest or not latest:
+            return  # That export has tags of its own already
+        
+        for tag, code in memberships:
+            self._add(tag, code)
+        for code, tag in latest:
+            self._add(tag, code)
+        # Written in one go rather than an fsync per entry
+        self.close()
+        self._compact()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+    
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+    
+    def add(self, tag, code):
+        """Tag a card, returning False if this was already its latest tag"""
+        if self.latest.get(code) == tag:
+            return False
+        self._add(tag, code)
+        self._append({"op": "add", "tag": tag, "code": code})
+        return True
+    
+    def clear(self):
+        self._clear()
+        self._append({"op": "clear"})
+    
+    def _add(self, tag, code):
+        self.tags[tag][code] = None
+        # Most recently tagged cards last, so a compacted journal replays in the same order
+        self.latest.pop(code, None)
+        self.latest[code] = tag
+    
+    def _clear(self):
+        for cards in self.tags.values():
+            cards.clear()
+        self.latest.clear()
+    
+    def _append(self, entry):
+        if self._journal is None:
+            return  # No collection loaded, the tags only live in memory
+        try:
+            self._journal.write(json.dumps(entry) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        except OSError as e:
+            print(f"Tag journal write error: {str(e)}")
+    
+    def _compact(self):
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            # Tag membership in tagging order, then each card's latest tag in the order given,
+            # so replaying restores both the tag lists and which tag write-back stores
+            for tag, cards in self.tags.items():
+                for code in cards:
+                    f.write(json.dumps({"op": "add", "tag": tag, "code": code}) + "\n")
+            for code, tag in self.latest.items():
+                f.write(json.dumps({"op": "add", "tag": tag, "code": code}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+    
+    def write_back(self, csv_path):
+        """Store each tagged card's tag in the CSV's tag column, returning how many rows changed
+        
+        Rows are streamed to a temporary file that then replaces the CSV, so the file
+        is never left half written and is never held in memory. Rows whose tag doesn't
+        change are copied as they were read, quoting included.
+        """
+        with open(csv_path, "rb") as f:
+            head = f.read(64 * 1024)
+        encoding = "utf-8-sig" if head.startswith(b"\xef\xbb\xbf") else "utf-8"
+        line_end = "\r\n" if b"\r\n" in head else "\n"
+        
+        temp_path = csv_path + ".tmp"
+        updated = 0
+        try:
+            with open(csv_path, "r", encoding=encoding, newline="") as src, \
+                    open(temp_path, "w", encoding=encoding, newline="") as dst:
+                # The reader pulls one record's lines at a time, kept to copy them unchanged
+                raw_lines = []
+                
+                def read_lines():
+                    for line in src:
+                        raw_lines.append(line)
+                        yield line
+                
+                reader = csv.reader(read_lines())
+                writer = csv.writer(dst, lineterminator=line_end)
+                header = next(reader, None)
+                if header is None:
+                    raise ValueError("CSV file is empty")
+                if "code" not in header:
+                    raise ValueError("CSV has no 'code' column")
+                
+                # Exports without a tag column get one, every row is then rewritten
+                add_column = "tag" not in header
+                if add_column:
+                    header = header + ["tag"]
+                    writer.writerow(header)
+                else:
+                    dst.write("".join(raw_lines))
+                raw_lines.clear()
+                code_col = header.index("code")
+                tag_col = header.index("tag")
+                
+                for row in reader:
+                    raw = "".join(raw_lines)
+                    raw_lines.clear()
+                    if len(row) <= tag_col:
+                        row.extend([""] * (tag_col + 1 - len(row)))
+                    tag = self.latest.get(row[code_col])
+                    if tag is not None and row[tag_col] != tag:
+                        row[tag_col] = tag
+                        updated += 1
+                        writer.writerow(row)
+                    elif add_column:
+                        writer.writerow(row)
+                    else:
+                        dst.write(raw)
+                
+                dst.flush()
+                os.fsync(dst.fileno())
+            shutil.copymode(csv_path, temp_path)
+            os.replace(temp_path, csv_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return updated
+
+class TagCommands:
+    """A tag's cards as kt commands that each fit in one chat message, built lazily"""
+    
+    ORDERS = ("Code", "Burn Value", "Tag Order")
+    DEFAULT_MAX_LENGTH = 2000
+    
+    def __init__(self, tag, codes, max_length=DEFAULT_MAX_LENGTH):
+        self.tag = tag
+        self.codes = codes  # In the order they should be sent
+        self.max_length = max_length
+        self.prefix = f"kt {tag} "
+        self.sent = 0       # Codes in the commands handed out so far
+        self.count = 0      # Commands handed out so far
+        if len(self.prefix) >= max_length:
+            raise ValueError(f"Max length must be more than {len(self.prefix)} characters")
+    
+    def __iter__(self):
+        budget = self.max_length - len(self.prefix)
+        batch = []
+        used = 0
+        for code in self.codes:
+            needed = len(code) + (1 if batch else 0)  # Comma before every code but the first
+            if batch and used + needed > budget:
+                yield self._emit(batch)
+                batch = []
+                used = 0
+                needed = len(code)
+            if needed > budget:
+                raise ValueError(f"Card code {code} doesn't fit in a {self.max_length} character command")
+            batch.append(code)
+            used += needed
+        if batch:
+            yield self._emit(batch)
+    
+    def _emit(self, batch):
+        self.sent += len(batch)
+        self.count += 1
+        return self.prefix + ",".join(batch)
+
+class BatchResolver:
+    """Finds candidate images for every card in a collection, without a UI"""
+    
+    def __init__(self, searcher, fetcher, manifest_path, thumb_dir=None, workers=4,
+                 result_cache=None, thumb_size=(300, 300)):
+        self.searcher = searcher
+        self.fetcher = fetcher
+        self.manifest_path = manifest_path
+        self.thumb_dir = thumb_dir
+        self.workers = workers
+        self.result_cache = result_cache
+        self.thumb_size = thumb_size
+        
+        # Cards sharing a character and series share one search
+        self._searches = {}
+        self._searches_lock = threading.Lock()
+    
+    def finished_codes(self):
+        """Codes already resolved by an earlier run of this manifest"""
+        codes = set()
+        if not os.path.exists(self.manifest_path):
+            return codes
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut off by an interrupted run
+                if entry.get("status") != "error":
+                    codes.add(entry["code"])
+        return codes
+    
+    def run(self, cards_df, progress=print):
+        """Resolve every card missing from the manifest, appending one line per card"""
+        finished = self.finished_codes()
+        pending = [
+            (code, char_name, series_name)
+            for code, char_name, series_name in zip(cards_df['code'], cards_df['character'], cards_df['series'])
+            if code not in finished
+        ]
+        progress(f"{len(finished)} cards already resolved, {len(pending)} to go")
+        if self.thumb_dir:
+            os.makedirs(self.thumb_dir, exist_ok=True)
+        
+        counts = {"ok": 0, "empty": 0, "error": 0}
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, \
+                open(self.manifest_path, "a", encoding="utf-8") as manifest:
+            # Only keep a few cards in flight so memory doesn't grow with the collection
+            cards = iter(pending)
+            in_flight = set()
+            while True:
+                while len(in_flight) < self.workers * 2:
+                    card = next(cards, None)
+                    if card is None:
+                        break
+                    in_flight.add(pool.submit(self._resolve, *card))
+                if not in_flight:
+                    break
+                
+                done = next(as_completed(in_flight))
+                in_flight.remove(done)
+                entry = done.result()
+                manifest.write(json.dumps(entry) + "\n")
+                manifest.flush()
+                
+                counts[entry["status"]] += 1
+                resolved = sum(counts.values())
+                if resolved % 25 == 0 or resolved == len(pending):
+                    rate = resolved / max(time.time() - started, 1e-6)
+                    progress(f"{resolved}/{len(pending)} cards ({rate:.1f}/s)")
+        return counts
+    
+    def _search(self, char_name, series_name):
+        key = f"{char_name}|{series_name}"
+        with self._searches_lock:
+            if key not in self._searches:
+                self._searches[key] = threading.Event(), [], []
+                owner = True
+            else:
+                owner = False
+            event, image_urls, errors = self._searches[key]
+        
+        if not owner:
+            event.wait()
+            if errors:
+                raise errors[0]
+            return image_urls
+        try:
+            stored_key = SearchResultCache.make_key(char_name, series_name, f"{char_name} {series_name}")
+            stored_urls = self.result_cache.get(stored_key) if self.result_cache is not None else None
+            if stored_urls:
+                image_urls.extend(stored_urls)
+            else:
+                image_urls.extend(self.searcher.search(char_name, series_name))
+                if image_urls and self.result_cache is not None:
+                    self.result_cache.put(stored_key, image_urls)
+        except Exception as e:
+            # The cards waiting on this search fail with it, later ones search again
+            errors.append(e)
+            with self._searches_lock:
+                self._searches.pop(key, None)
+            raise
+        finally:
+            event.set()
+        return image_urls
+    
+    def _resolve(self, code, char_name, series_name):
+        entry = {"code": code, "character": char_name, "series": series_name}
+        try:
+            image_urls = self._search(char_name, series_name)
+            entry["urls"] = image_urls
+            entry["status"] = "ok" if image_urls else "empty"
+            if self.thumb_dir and image_urls:
+                entry["thumbnail"] = self._save_thumbnail(code, image_urls)
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = str(e)
+        return entry
+    
+    def _save_thumbnail(self, code, image_urls):
+        """Save a thumbnail of the first usable result, returning its path"""
+        for image_url in image_urls:
+            try:
+                image, _, _ = self.fetcher.fetch(image_url, self.thumb_size)
+            except Exception:
+                continue
+            safe_code = re.sub(r'[^A-Za-z0-9_-]', '_', str(code))
+            thumb_path = os.path.join(self.thumb_dir, f"{safe_code}.jpg")
+            image.convert('RGB').save(thumb_path, "JPEG", quality=85)
+            return thumb_path
+        return None
+
 class KarutaImageFinder:
+    WATCH_INTERVAL_MS = 2000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Karuta Card Image Finder")
@@ -31,13 +2400,78 @@ class KarutaImageFinder:
         self.root.configure(bg="#f0f0f0")
         
         # Data storage
-        self.cards_df = None
+        self.cards = None         # CardModel of the loaded collection
+        self.search_index = None
+        self.list_columns = None  # Arrays used to format the visible list rows
+        self.sort_cache = None
+        self.loader = None        # CollectionLoader of the load in progress
+        self.cards_lock = threading.Lock()  # Guards the card data shared with the filter worker
+        
+        # Parsed CSVs are cached on disk, loading still works without the cache
+        try:
+            self.csv_cache = CsvCache()
+        except OSError as e:
+            print(f"CSV cache unavailable: {str(e)}")
+            self.csv_cache = None
+        
         self.current_image = None
         self.search_results = {}  # Cache for search results
         
+        # Search results from earlier sessions, so known cards skip the network
+        try:
+            self.result_cache = SearchResultCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Search result cache unavailable: {str(e)}")
+            self.result_cache = None
+        
+        # Downloaded images, including which URLs turned out not to be usable
+        try:
+            self.image_cache = ImageCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Image cache unavailable: {str(e)}")
+            self.image_cache = None
+        
+        # All searches and image downloads share one pooled HTTP client
+        self.http = HttpClient()
+        self.searcher = ImageSearcher(self.http)
+        self.fetcher = ImageFetcher(self.http, self.image_cache)
+        
+        # Images are decoded and resized on a worker pool, which also prepares
+        # the next few results while the current one is shown
+        self.prefetcher = ImagePrefetcher(self._prepare_image)
+        
+        # Upcoming results are probed from their first few KB so bad ones are skipped early
+        self.validator = CandidateValidator(self.fetcher.probe)
+        
+        # Results showing the same picture as a larger result are skipped by Next Result
+        self.duplicate_filter = DuplicateFilter()
+        self.hide_duplicates = tk.BooleanVar(value=True)
+        self.hidden_duplicates = set()  # URLs of the selected card's results
+        self.display_generation = 0  # Bumped to drop images still being prepared
+        
         # Sorting options
         self.sort_enabled = tk.BooleanVar(value=True)
         self.sort_ascending = tk.BooleanVar(value=False)  # Default: highest burn value first
+        self.sort_key = tk.StringVar(value="Burn Value")
+        self.sort_then_key = tk.StringVar(value="None")
+        self.view_ascending = False  # Direction of the rows currently in the list
+        self.view_ranked = False     # True while the list holds ranked fuzzy matches
+        
+        # Worker threads never touch widgets, they post updates to the Tk thread
+        self.ui = UiDispatcher(self.root)
+        
+        # A watched file (or the newest CSV in a watched folder) is reloaded in place when it changes
+        self.watch_enabled = tk.BooleanVar(value=False)
+        self.watch_path = None        # File or folder named in the entry when loading
+        self.loaded_path = None       # CSV the cards came from
+        self.loaded_signature = None  # Its (size, mtime) when it was read
+        self.changed_signature = None # Signature seen on the previous poll, if it differed
+        self.reloading = False
+        self.reload_message = None    # Status to show once the reloaded list is in place
+        self.root.after(self.WATCH_INTERVAL_MS, self._poll_watch)
+        
+        # Keystroke filtering runs debounced on a worker thread
+        self.filter_scheduler = FilterScheduler(self.root, self._compute_filter, self._apply_filter)
         
         # Set up the UI
         try:
@@ -46,6 +2480,17 @@ class KarutaImageFinder:
         except Exception as e:
             messagebox.showerror("UI Error", f"Error setting up UI: {str(e)}")
             raise
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def on_close(self):
+        """Stop the background downloads so the app exits without waiting for them"""
+        for worker in (self.prefetcher, self.validator, self.searcher):
+            worker.shutdown()
+        if self.loader is not None:
+            self.loader.cancel()
+        self.tag_store.close()
+        self.root.destroy()
     
     def setup_ui(self):
         # Top frame for file loading
@@ -57,17 +2502,13 @@ class KarutaImageFinder:
         self.file_entry.pack(side=tk.LEFT, padx=5)
         tk.Button(top_frame, text="Browse", command=self.browse_file).pack(side=tk.LEFT, padx=5)
         tk.Button(top_frame, text="Load", command=self.load_file).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(top_frame, text="Watch for changes", variable=self.watch_enabled, bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
         
-        # Initialize tag tracking
-        self.tag_cards = {
-            "burn": set(),
-            "cute": set(),
-            "kot" : set(),
-            "favorite": set(),
-            "good": set(),
-            "ok": set(),
-            "wife": set()
-        }
+        # Initialize tag tracking, journaled per collection once one is loaded
+        self.tag_store = TagStore(["burn", "cute", "kot", "favorite", "good", "ok", "wife"])
+        self.tag_cards = self.tag_store.tags
+        self.tag_commands = None    # TagCommands being copied chunk by chunk
+        self.command_chunks = None  # Its iterator
         
         # Main content frame
         content_frame = tk.Frame(self.root, bg="#f0f0f0")
@@ -87,18 +2528,24 @@ class KarutaImageFinder:
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         self.search_entry.bind("<KeyRelease>", self.filter_cards)
         
-        # Card list with scrollbar
-        list_frame = tk.Frame(left_panel, bg="#f0f0f0")
-        list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Contains matches substrings, Fuzzy ranks near matches by score then burn value,
+        # Query filters with expressions like: burnValue >= 40 and series:naruto and untagged
+        self.search_mode = tk.StringVar(value="Contains")
+        mode_combo = ttk.Combobox(
+            search_frame,
+            textvariable=self.search_mode,
+            values=["Contains", "Fuzzy", "Query"],
+            state="readonly",
+            width=8
+        )
+        mode_combo.pack(side=tk.LEFT, padx=5)
+        mode_combo.bind("<<ComboboxSelected>>", lambda e: self.filter_cards())
         
-        self.card_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, height=25, font=("Arial", 10))
-        self.card_listbox.pack(fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.card_listbox.yview)
+        # Card list with scrollbar, only the visible rows are materialized
+        self.card_listbox = VirtualCardList(left_panel, self._format_card, height=25, font=("Arial", 10))
+        self.card_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.card_listbox.bind("<<ListboxSelect>>", self.on_card_select)
+        self.card_listbox.bind("<<CardSelect>>", self.on_card_select)
         
         # Right panel - card details and image
         right_panel = tk.Frame(content_frame, bg="#f0f0f0")
@@ -134,6 +2581,7 @@ class KarutaImageFinder:
         tk.Button(button_frame, text="Search Image", command=self.search_image).pack(side=tk.LEFT, padx=5)
         tk.Button(button_frame, text="Save Image", command=self.save_image).pack(side=tk.LEFT, padx=5)
         tk.Button(button_frame, text="Next Result", command=self.next_result).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(button_frame, text="Hide duplicates", variable=self.hide_duplicates, bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
         
         # Tag buttons frame
         tag_frame = tk.Frame(right_panel, bg="#f0f0f0")
@@ -175,7 +2623,9 @@ class KarutaImageFinder:
         # Generate and copy buttons
         tk.Button(cmd_frame, text="Generate", command=self.generate_command).pack(side=tk.LEFT, padx=3)
         tk.Button(cmd_frame, text="Copy", command=self.copy_command).pack(side=tk.LEFT, padx=3)
+        tk.Button(cmd_frame, text="Copy Next", command=self.copy_next_command).pack(side=tk.LEFT, padx=3)
         tk.Button(cmd_frame, text="Clear Tags", command=self.clear_tags).pack(side=tk.LEFT, padx=3)
+        tk.Button(cmd_frame, text="Save to CSV", command=self.save_tags_to_csv).pack(side=tk.LEFT, padx=3)
         
         # Tag status frame
         tag_status_frame = tk.Frame(right_panel, bg="#f0f0f0")
@@ -197,6 +2647,8 @@ class KarutaImageFinder:
         self.status_var.set("Ready")
         status_bar = tk.Label(self.root, textvariable=self.status_var, bd=1, relief=tk.SUNKEN, anchor=tk.W)
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        # The per-column memory breakdown is shown on request
+        status_bar.bind("<Double-Button-1>", lambda e: self.show_memory_report())
     
     def setup_sort_controls(self):
         """Add sorting controls to the interface"""
@@ -206,13 +2658,35 @@ class KarutaImageFinder:
         # Add sort checkbox
         sort_check = tk.Checkbutton(
             sort_frame, 
-            text="Sort by Burn Value", 
+            text="Sort by", 
             variable=self.sort_enabled,
             bg="#f0f0f0",
             command=self.apply_sort
         )
         sort_check.pack(side=tk.LEFT, padx=5)
         
+        # Primary and secondary sort keys
+        self.sort_key_combo = ttk.Combobox(
+            sort_frame,
+            textvariable=self.sort_key,
+            values=list(SortCache.SORT_KEYS),
+            state="readonly",
+            width=12
+        )
+        self.sort_key_combo.pack(side=tk.LEFT, padx=5)
+        self.sort_key_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_sort())
+        
+        tk.Label(sort_frame, text="then by", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        self.sort_then_combo = ttk.Combobox(
+            sort_frame,
+            textvariable=self.sort_then_key,
+            values=["None"] + list(SortCache.SORT_KEYS),
+            state="readonly",
+            width=12
+        )
+        self.sort_then_combo.pack(side=tk.LEFT, padx=5)
+        self.sort_then_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_sort())
+        
         # Add ascending/descending radio buttons
         tk.Label(sort_frame, text="Sort Order:", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
         
@@ -222,7 +2696,7 @@ class KarutaImageFinder:
             variable=self.sort_ascending,
             value=False,
             bg="#f0f0f0",
-            command=self.apply_sort
+            command=self.flip_sort_order
         )
         desc_radio.pack(side=tk.LEFT, padx=5)
         
@@ -232,19 +2706,39 @@ class KarutaImageFinder:
             variable=self.sort_ascending,
             value=True,
             bg="#f0f0f0",
-            command=self.apply_sort
+            command=self.flip_sort_order
         )
         asc_radio.pack(side=tk.LEFT, padx=5)
     
     def apply_sort(self):
         """Apply the current sort settings and refresh the list"""
         # Skip if no data loaded
-        if self.cards_df is None:
+        if self.cards is None:
             return
             
         # Refresh the list with current sort settings
         self.filter_cards()
     
+    def flip_sort_order(self):
+        """Switch between highest and lowest first by reversing the current list"""
+        if self.cards is None or not self.sort_enabled.get():
+            return
+        if self.view_ranked:
+            # Fuzzy matches stay best first, the order applies once the search is cleared
+            self.status_var.set("Fuzzy matches are ordered by how well they match")
+            return
+        
+        if self.sort_ascending.get() != self.view_ascending:
+            self._show_rows(self.card_listbox.row_ids[::-1], self.sort_ascending.get())
+    
+    def _sort_keys(self):
+        """Sort keys chosen in the UI, primary key first"""
+        keys = [self.sort_key.get()]
+        then_key = self.sort_then_key.get()
+        if then_key != "None" and then_key not in keys:
+            keys.append(then_key)
+        return tuple(key for key in keys if key in self.sort_cache.keys)
+    
     def browse_file(self):
         try:
             filename = filedialog.askopenfilename(
@@ -266,7 +2760,6 @@ class KarutaImageFinder:
         
         try:
             self.status_var.set("Loading CSV file...")
-            self.root.update()
             
             # Check if file exists
             if not os.path.exists(filepath):
@@ -274,145 +2767,386 @@ class KarutaImageFinder:
                 self.status_var.set("Error: File not found")
                 return
                 
-            # Load the CSV file
-            try:
-                # Load the full CSV first
-                full_df = pd.read_csv(filepath)
-                
-                # Check if required columns exist
-                required_cols = ['character', 'series', 'code', 'quality']
-                missing_cols = [col for col in required_cols if col not in full_df.columns]
-                
-                if missing_cols:
-                    messagebox.showerror("Error", f"CSV is missing required columns: {', '.join(missing_cols)}")
-                    self.status_var.set("Error: Invalid CSV format")
-                    self.cards_df = None
+            # A folder of exports loads the newest one
+            watch_path = filepath
+            if os.path.isdir(filepath):
+                filepath = self._newest_csv(filepath)
+                if filepath is None:
+                    messagebox.showerror("Error", f"No CSV files in {watch_path}")
+                    self.status_var.set("Error: No CSV files found")
                     return
-                
-                # Check if 'tag' column exists
-                if 'tag' not in full_df.columns:
-                    messagebox.showwarning("Warning", "No 'tag' column found in CSV. Unable to filter by empty tags.")
-                    self.cards_df = full_df
-                else:
-                    # Filter to only rows where tag is empty (NaN, None, or empty string)
-                    self.cards_df = full_df[full_df['tag'].isna() | (full_df['tag'] == '')]
-                    messagebox.showinfo("Info", f"Loaded {len(self.cards_df)} cards with empty tags out of {len(full_df)} total cards")
-                
-                # Convert quality to numeric if it's not already
-                if not pd.api.types.is_numeric_dtype(self.cards_df['quality']):
-                    try:
-                        self.cards_df['quality'] = pd.to_numeric(self.cards_df['quality'])
-                    except:
-                        messagebox.showwarning("Warning", "Could not convert quality values to numbers. Sorting may not work correctly.")
-                
-                # Sort cards by burn value (quality) if sorting is enabled
-                if self.sort_enabled.get():
-                    self.cards_df = self.cards_df.sort_values(
-                        by='burnValue', 
-                        ascending=self.sort_ascending.get()
-                    ).reset_index(drop=True)
-                
-                # Clear the listbox
-                self.card_listbox.delete(0, tk.END)
-                
-                # Populate the listbox with card names and burn value
-                for idx, row in self.cards_df.iterrows():
-                    char_name = row['character']
-                    series_name = row['series']
-                    bv = int(row['burnValue'])  # Convert to int to remove decimals
-                    list_text = f"{bv} $ | {char_name} ({series_name})"
-                    self.card_listbox.insert(tk.END, list_text)
-                
-                self.status_var.set(f"Loaded {len(self.cards_df)} cards with empty tags")
+            
+            # Read the header first, the rows are streamed in the background
+            try:
+                loader = CollectionLoader(filepath, cache=self.csv_cache)
             except pd.errors.EmptyDataError:
                 messagebox.showerror("Error", "CSV file is empty")
                 self.status_var.set("Error: Empty CSV file")
+                return
             except pd.errors.ParserError:
                 messagebox.showerror("Error", "CSV parsing error. Check file format.")
                 self.status_var.set("Error: CSV parsing error")
+                return
+            
+            # Check if required columns exist
+            missing_cols = loader.missing_columns()
+            if missing_cols:
+                messagebox.showerror("Error", f"CSV is missing required columns: {', '.join(missing_cols)}")
+                self.status_var.set("Error: Invalid CSV format")
+                return
+            
+            # Check if 'tag' column exists
+            if not loader.filter_tags:
+                messagebox.showwarning("Warning", "No 'tag' column found in CSV. Unable to filter by empty tags.")
             
+            # Stop a load that is still running and start over with an empty list
+            if self.loader is not None:
+                self.loader.cancel()
+            self.loader = loader
+            self._clear_cards()
+            
+            self.load_started = time.time()
+            self.watch_path = watch_path
+            self.loaded_path = filepath
+            self.loaded_signature = self._file_signature(filepath)
+            self.changed_signature = None
+            loader.start()
+            self.root.after(100, self._poll_loader, loader)
+            
+            # Bring back the tags from an earlier session with this collection
+            try:
+                self.tag_store.open(filepath)
+            except OSError as e:
+                print(f"Tag journal unavailable: {str(e)}")
+            self.command_var.set("")
+            self.command_chunks = None
+            self.update_tag_status()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load CSV file: {str(e)}")
             self.status_var.set("Error loading CSV")
-    def filter_cards(self, event=None):
-        search_term = self.search_entry.get().lower()
+    
+    def _poll_loader(self, loader):
+        """Add the chunks parsed since the last tick and report progress"""
+        if loader is not self.loader:
+            return
+        
+        chunks = []
+        finished = False
+        error = None
+        try:
+            while True:
+                kind, payload = loader.messages.get_nowait()
+                if kind == "chunk":
+                    chunks.append(payload)
+                elif kind == "done":
+                    finished = True
+                else:
+                    error = payload
+        except queue.Empty:
+            pass
+        
+        # Show the partial results as they arrive
+        if chunks:
+            self._add_cards(pd.concat(chunks, ignore_index=True))
+            self.filter_cards()
+        
+        elapsed = max(time.time() - self.load_started, 1e-6)
+        rate = loader.rows_read / elapsed
+        
+        if error is not None:
+            self.loader = None
+            if isinstance(error, pd.errors.ParserError):
+                messagebox.showerror("Error", "CSV parsing error. Check file format.")
+                self.status_var.set("Error: CSV parsing error")
+            else:
+                messagebox.showerror("Error", f"Failed to load CSV file: {str(error)}")
+                self.status_var.set("Error loading CSV")
+        elif finished:
+            self.loader = None
+            card_count = 0
+            if self.cards is not None:
+                with self.cards_lock:
+                    self.cards.compact()
+                    self._update_list_columns()
+                card_count = self.cards.live_count()
+            source = "from cache" if loader.from_cache else f"{rate:,.0f} rows/s"
+            self.status_var.set(f"Loaded {card_count} cards with empty tags ({source}, {self._memory_summary()})")
+            if loader.filter_tags:
+                messagebox.showinfo("Info", f"Loaded {card_count} cards with empty tags out of {loader.rows_read} total cards")
+            if not loader.quality_numeric:
+                messagebox.showwarning("Warning", "Could not convert quality values to numbers. Sorting may not work correctly.")
+        else:
+            self.status_var.set(f"Loading CSV file... {loader.rows_read:,} rows read ({rate:,.0f} rows/s)")
+            self.root.after(100, self._poll_loader, loader)
+    
+    @staticmethod
+    def _newest_csv(folder):
+        paths = [os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith(".csv")]
+        return max(paths, key=os.path.getmtime, default=None)
+    
+    @staticmethod
+    def _file_signature(filepath):
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+    
+    def _poll_watch(self):
+        """Reload the watched collection once it has changed and stopped changing"""
+        self.root.after(self.WATCH_INTERVAL_MS, self._poll_watch)
+        if not self.watch_enabled.get() or self.cards is None or self.loader is not None or self.reloading:
+            return
+        
+        try:
+            path = self._newest_csv(self.watch_path) if os.path.isdir(self.watch_path) else self.watch_path
+        except OSError:
+            return
+        signature = self._file_signature(path) if path else None
+        if signature is None or (path == self.loaded_path and signature == self.loaded_signature):
+            self.changed_signature = None
+            return
+        
+        # Wait a poll for exports that are still being written
+        if signature != self.changed_signature:
+            self.changed_signature = signature
+            return
+        self.changed_signature = None
+        self._start_reload(path, signature)
+    
+    def _start_reload(self, path, signature):
+        """Read the changed file on a worker and diff it against the loaded cards"""
+        self.reloading = True
+        self.status_var.set(f"Reloading {os.path.basename(path)}...")
+        cards = self.cards
+        
+        def work():
+            try:
+                loader = CollectionLoader(path, cache=self.csv_cache)
+                missing_cols = loader.missing_columns()
+                if missing_cols:
+                    raise ValueError(f"CSV is missing required columns: {', '.join(missing_cols)}")
+                new_df = loader.read_all()
+                with self.cards_lock:
+                    result = cards.diff(new_df)
+            except Exception as e:
+                result = e
+            self.ui.post(self._apply_reload, cards, path, signature, result)
+        
+        threading.Thread(target=work, daemon=True).start()
+    
+    def _apply_reload(self, cards, path, signature, result):
+        """Apply a reload's added, removed and changed rows to the model, indexes and list"""
+        self.reloading = False
+        if cards is not self.cards:
+            return  # Another collection was loaded meanwhile
+        
+        # Don't retry the same version of the file after an error
+        previous_path, self.loaded_path = self.loaded_path, path
+        self.loaded_signature = signature
+        if isinstance(result, Exception):
+            self.status_var.set(f"Reload failed: {str(result)}")
+            print(f"Reload error ({path}): {str(result)}")
+            return
+        
+        # Tags follow a watched folder to its newer export
+        if path != previous_path:
+            try:
+                self.tag_store.move_to(path)
+            except OSError as e:
+                print(f"Tag journal unavailable: {str(e)}")
+            self.update_tag_status()
         
-        if not self.cards_df is None:
-            # Clear the listbox
-            self.card_listbox.delete(0, tk.END)
+        removed, changed, changed_df, added_df = result
+        summary = f"{len(added_df)} added, {len(removed)} removed, {len(changed)} changed"
+        if not (len(removed) or len(changed) or len(added_df)):
+            self.status_var.set(f"Reloaded {os.path.basename(path)}: no changes")
+            return
+        
+        with self.cards_lock:
+            if len(removed):
+                self.cards.remove(removed)
+                self.search_index.remove_rows(removed)
+            if len(changed):
+                self.cards.update(changed, changed_df)
+                self.search_index.update_rows(changed, changed_df['character'], changed_df['series'])
+            if len(added_df):
+                self.cards.append(added_df)
+                self.search_index.add_rows(added_df['character'], added_df['series'])
             
-            # Apply sorting if enabled
-            if self.sort_enabled.get():
-                sorted_df = self.cards_df.sort_values(
-                    by='burnValue', 
-                    ascending=self.sort_ascending.get()
-                )
+            self.sort_cache = SortCache(self.cards)
+            self._update_list_columns()
+        
+        # Refilter with the current query, keeping the scroll position and selection
+        self.reload_message = f"Reloaded {os.path.basename(path)}: {summary}"
+        self.filter_cards()
+    
+    def _clear_cards(self):
+        """Forget the loaded collection"""
+        with self.cards_lock:
+            self.cards = None
+            self.search_index = None
+            self.sort_cache = None
+            self.list_columns = None
+        self.card_listbox.set_rows([])
+    
+    def _add_cards(self, new_df):
+        """Append newly loaded cards and extend the indexes built on them"""
+        self._extend_cards(new_df)
+        self.sort_key_combo.config(values=self.sort_cache.keys)
+        self.sort_then_combo.config(values=["None"] + self.sort_cache.keys)
+    
+    def _extend_cards(self, new_df):
+        """The part of _add_cards that doesn't touch widgets"""
+        with self.cards_lock:
+            if self.cards is None:
+                self.cards = CardModel()
+                self.search_index = CardSearchIndex(new_df['character'], new_df['series'])
             else:
-                sorted_df = self.cards_df
-            
-            # Filter and repopulate
-            for idx, row in sorted_df.iterrows():
-                char_name = row['character']
-                series_name = row['series']
-                bv = int(row['burnValue'])  # Convert to int to remove decimals
-                list_text = f"{bv} ★ | {char_name} ({series_name})"
-                
-                if search_term == "" or (search_term in char_name.lower() or search_term in series_name.lower()):
-                    self.card_listbox.insert(tk.END, list_text)
+                self.search_index.add_rows(new_df['character'], new_df['series'])
+            self.cards.append(new_df)
+            
+            # Sort orders are computed on first use and kept until the data changes
+            self.sort_cache = SortCache(self.cards)
+            self._update_list_columns()
+    
+    def _update_list_columns(self):
+        """Columns used to format the visible list rows"""
+        self.list_columns = (
+            self.cards.column('burnValue'),
+            self.cards.column('character'),
+            self.cards.names['character'],
+            self.cards.column('series'),
+            self.cards.names['series']
+        )
+    
+    def show_memory_report(self):
+        """Show how much memory each column of the loaded cards takes"""
+        if self.cards is None:
+            return
+        messagebox.showinfo("Memory Usage", "\n".join(self.cards.memory_report()))
+    
+    def _memory_summary(self):
+        if self.cards is None:
+            return "no cards"
+        total = sum(self.cards.memory_usage().values())
+        return f"{total / 1e6:.1f} MB in memory, about {self.cards.source_bytes / 1e6:.1f} MB as a DataFrame"
+    
+    def filter_cards(self, event=None):
+        """Schedule a filter run; keystrokes are debounced, other refreshes run immediately"""
+        if self.cards is None:
+            return
+        
+        # Tk variables and tags are read here since the worker must not touch them
+        search_mode = self.search_mode.get()
+        tags = None
+        if search_mode == "Query":
+            tags = {tag: tuple(cards) for tag, cards in self.tag_cards.items()}
+        query = (
+            self.search_entry.get().lower(), search_mode, tags,
+            self.sort_enabled.get(), self._sort_keys(), self.sort_ascending.get()
+        )
+        delay = None if event is not None else 0
+        self.filter_scheduler.schedule(query, delay_ms=delay)
+    
+    def _compute_filter(self, query, is_stale):
+        """Find and order the matching row ids off the UI thread"""
+        search_term, search_mode, tags, sort_enabled, sort_keys, sort_ascending = query
+        if self.search_index is None:
+            return None
+        
+        with self.cards_lock:
+            # Fuzzy matches are ranked by score, then highest burn value
+            if search_mode == "Fuzzy" and search_term.strip():
+                row_ids, scores = self.search_index.fuzzy_search(search_term)
+                burn_values = self.cards.column('burnValue')[row_ids]
+                return row_ids[np.lexsort((-np.nan_to_num(burn_values, nan=-np.inf), -scores))]
             
-            self.status_var.set(f"Found {self.card_listbox.size()} cards matching '{search_term}'")
+            if search_mode == "Query" and search_term.strip():
+                try:
+                    row_ids = np.flatnonzero(CardQuery.compile(search_term).mask(self.cards, tags))
+                except QueryError as e:
+                    return e
+            else:
+                # Look up matching rows in the search index
+                row_ids = self.search_index.search(search_term)
+            if is_stale():
+                return None
+        
+            # Apply sorting if enabled, using the cached permutation
+            if sort_enabled and sort_keys:
+                row_ids = self.sort_cache.sort_rows(row_ids, sort_keys, sort_ascending)
+        return row_ids
+    
+    def _apply_filter(self, query, row_ids):
+        """Show the row ids of the latest filter result"""
+        search_term, search_mode, tags, sort_enabled, sort_keys, sort_ascending = query
+        ranked = search_mode == "Fuzzy" and search_term.strip()
+        if isinstance(row_ids, QueryError):
+            # Keep the last results while the query is being typed
+            self.status_var.set(f"Query: {row_ids}")
+            return
+        
+        # The order may have been flipped while this filter was running
+        if sort_enabled and not ranked and sort_ascending != self.sort_ascending.get():
+            row_ids = row_ids[::-1]
+        reload_message, self.reload_message = self.reload_message, None
+        self.view_ranked = bool(ranked)
+        self._show_rows(row_ids, self.sort_ascending.get(), keep_view=reload_message is not None)
+        
+        self.status_var.set(reload_message or f"Found {self.card_listbox.size()} cards matching '{search_term}'")
+    
+    def _show_rows(self, row_ids, ascending, keep_view=False):
+        """Put row ids in the list, keeping the current card selected if it is still there"""
+        self.card_listbox.set_rows(row_ids, keep_view)
+        self.view_ascending = ascending
+        
+        code = self.code_label.cget("text")
+        row_id = self.cards.row_of(code) if code and self.cards is not None else None
+        if row_id is not None:
+            # A kept view stays where it was, even with the selection scrolled out of it
+            self.card_listbox.select_row(row_id, notify=False, scroll=not keep_view)
+    
+    def _format_card(self, row_id):
+        """Display text for one row of the card list"""
+        burn_values, characters, character_names, series, series_names = self.list_columns
+        bv = int(burn_values[row_id])  # Convert to int to remove decimals
+        return f"{bv} ★ | {character_names[characters[row_id]]} ({series_names[series[row_id]]})"
     
     def on_card_select(self, event=None):
-        # Get the selected index
-        selection = self.card_listbox.curselection()
-        if not selection:
-            return
-        
-        # Get the name at the selected index
-        selected_idx = selection[0]
-        all_items = self.card_listbox.get(0, tk.END)
-        selected_text = all_items[selected_idx]
-        
-        # Extract character and series from the text
-        # Format is "Quality ★ | Character (Series)"
-        parts = selected_text.split(" | ")
-        if len(parts) < 2:
-            return
-            
-        char_series = parts[1]  
-
-        char_end = char_series.rfind("(")
-        if char_end > 0:
-            char_name = char_series[:char_end].strip()
-            series_name = char_series[char_end+1:].replace(")", "").strip()
-            
-            # Find the corresponding row in the dataframe
-            for idx, row in self.cards_df.iterrows():
-                if row['character'] == char_name and row['series'] == series_name:
-                    # Update the labels
-                    self.character_label.config(text=char_name)
-                    self.series_label.config(text=series_name)
-                    self.code_label.config(text=row['code'])
-                    
-                    # Make the quality more prominent with star symbol
-                    bv = int(row['burnValue'])
-                    self.quality_label.config(text=f"{bv} $")
-                    
-                    # Clear the image
-                    self.current_image = None
-                    self.image_label.config(image="", text="No image loaded")
-                    
-                    # Update tag status to highlight current card's tags
-                    code = row['code']
-                    current_tags = []
-                    for tag, cards in self.tag_cards.items():
-                        if code in cards:
-                            current_tags.append(tag.title())
-                    
-                    if current_tags:
-                        self.status_var.set(f"Card is tagged as: {', '.join(current_tags)}")
-                    
-                    break
+        # The list keeps the row id of every visible entry, so no text parsing is needed
+        row_id = self.card_listbox.selected_row()
+        if row_id is None:
+            return
+        
+        row, current_tags = self._card_details(row_id)
+        code = row['code']
+        
+        # Update the labels
+        self.character_label.config(text=row['character'])
+        self.series_label.config(text=row['series'])
+        self.code_label.config(text=code)
+            
+        # Make the quality more prominent with star symbol
+        bv = int(row['burnValue'])
+        self.quality_label.config(text=f"{bv} $")
+
+        # Clear the image
+        self.current_image = None
+        self.image_label.config(image="", text="No image loaded")
+        self.prefetcher.reset()
+        self.display_generation += 1
+        self.hidden_duplicates = set()
+            
+        # Update tag status to highlight current card's tags
+        if current_tags:
+            self.status_var.set(f"Card is tagged as: {', '.join(current_tags)}")
+    
+    def _card_details(self, row_id):
+        """The card at row_id and the titles of its tags"""
+        row = self.cards.card(row_id)
+        current_tags = [tag.title() for tag, cards in self.tag_cards.items() if row['code'] in cards]
+        return row, current_tags
     
     def search_image(self):
         char_name = self.character_label.cget("text")
@@ -424,6 +3158,7 @@ class KarutaImageFinder:
         
         # Clear any previous image
         self.image_label.config(image="", text="Searching for images...\nPlease wait...")
+        self.validator.reset()
         
         # Start search in a separate thread
         search_thread = threading.Thread(target=self.simple_search_image, args=(char_name, series_name))
@@ -433,229 +3168,158 @@ class KarutaImageFinder:
     def simple_search_image(self, char_name, series_name):
         """A simple, reliable search method that uses standard web searches"""
         try:
-            self.status_var.set(f"Searching for {char_name} from {series_name}...")
-            self.root.update_idletasks()
+            self._post_status(f"Searching for {char_name} from {series_name}...")
             
             # Create a search key for caching
             search_key = f"{char_name}|{series_name}"
             
+            # Fall back to the results stored by earlier sessions
+            stored_key = SearchResultCache.make_key(char_name, series_name, f"{char_name} {series_name}")
+            if not self.search_results.get(search_key) and self.result_cache is not None:
+                stored_urls = self.result_cache.get(stored_key)
+                if stored_urls:
+                    self.search_results[search_key] = stored_urls
+            
             # Check cache first
             if search_key in self.search_results and self.search_results[search_key]:
                 image_urls = self.search_results[search_key]
-                self.status_var.set(f"Found {len(image_urls)} cached images")
-            else:
-                # Build search queries
-                queries = [
-                    f"{char_name} {series_name}",  # Basic query
-                    f"{char_name} {series_name} anime character",  # Specify anime character
-                    f"{char_name} from {series_name}"  # Alternative format
-                ]
-                
-                # Use the first query by default
-                query = queries[0]
-                
-                # Headers to mimic a browser
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5'
-                }
-                
-                # Simple approach to get images
-                image_urls = []
-                
-                # Try Google Images first
-                try:
-                    encoded_query = urllib.parse.quote(query)
-                    search_url = f"https://www.google.com/search?q={encoded_query}&tbm=isch"
-                    
-                    response = requests.get(search_url, headers=headers, timeout=10)
-                    
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # Extract all image elements
-                        for img in soup.find_all('img'):
-                            if img.has_attr('src') and ('http' in img['src'] or '//' in img['src']):
-                                url = img['src']
-                                if url.startswith('//'):
-                                    url = 'https:' + url
-                                if url not in image_urls and not url.endswith('.svg'):
-                                    image_urls.append(url)
-                        
-                        # Look for image URLs in JSON data
-                        scripts = soup.find_all("script")
-                        for script in scripts:
-                            script_text = script.string or ""
-                            img_urls = re.findall(r'(https?://[^\s"\']+\.(jpg|jpeg|png|gif))', script_text)
-                            for url, _ in img_urls:
-                                if url not in image_urls:
-                                    image_urls.append(url)
-                                    
-                        # Extract from possible JSON data
-                        for script in soup.find_all('script'):
-                            if script.string and '"ou":"http' in script.string:
-                                matches = re.findall(r'"ou":"(http[^"]+)"', script.string)
-                                for url in matches:
-                                    if url not in image_urls:
-                                        image_urls.append(url)
-                except Exception as e:
-                    print(f"Google search error: {str(e)}")
-                
-                # If Google didn't return enough, try Bing as backup
-                if len(image_urls) < 5:
-                    try:
-                        encoded_query = urllib.parse.quote(query)
-                        search_url = f"https://www.bing.com/images/search?q={encoded_query}&form=HDRSC2&first=1"
-                        
-                        response = requests.get(search_url, headers=headers, timeout=10)
-                        
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.text, 'html.parser')
-                            
-                            # Extract from standard img tags
-                            for img in soup.find_all('img'):
-                                if img.has_attr('src') and ('http' in img['src'] or '//' in img['src']):
-                                    url = img['src']
-                                    if url.startswith('//'):
-                                        url = 'https:' + url
-                                    if url not in image_urls and not url.endswith('.svg'):
-                                        image_urls.append(url)
-                    except Exception as e:
-                        print(f"Bing search error: {str(e)}")
-                
-                # Try a different query if we still don't have enough images
-                if len(image_urls) < 5 and len(queries) > 1:
-                    try:
-                        encoded_query = urllib.parse.quote(queries[1])
-                        search_url = f"https://www.google.com/search?q={encoded_query}&tbm=isch"
-                        
-                        response = requests.get(search_url, headers=headers, timeout=10)
-                        
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.text, 'html.parser')
-                            
-                            # Extract all image elements
-                            for img in soup.find_all('img'):
-                                if img.has_attr('src') and ('http' in img['src'] or '//' in img['src']):
-                                    url = img['src']
-                                    if url.startswith('//'):
-                                        url = 'https:' + url
-                                    if url not in image_urls and not url.endswith('.svg'):
-                                        image_urls.append(url)
-                    except Exception as e:
-                        print(f"Alternative query search error: {str(e)}")
+                self._post_status(f"Found {len(image_urls)} cached images")
                 
-                # Filter out small images, icons, etc.
-                filtered_urls = []
-                for url in image_urls:
-                    # Skip likely non-image resources
-                    if any(skip in url.lower() for skip in ['icon', 'logo', 'button', 'emoji', 'spinner', 'transparent']):
-                        continue
-                    # Skip SVGs
-                    if url.lower().endswith('.svg'):
-                        continue
-                    # Skip very small URLs (likely thumbnails/icons)
-                    if 'w=32' in url or 'w=16' in url or 'width=32' in url or 'width=16' in url:
-                        continue
-                    
-                    filtered_urls.append(url)
+                # Display the first image
+                self.current_result_index = 0
+                self.ui.post(self._display_image, image_urls[0])
+                return
+            
+            # Results stream into this list while the remaining providers answer
+            image_urls = []
+            self.search_results[search_key] = image_urls
+            
+            def on_results(new_urls):
+                first_batch = not image_urls
+                image_urls.extend(new_urls)
+                self._post_status(f"Found {len(image_urls)} images so far...")
                 
-                # Cache the results
-                self.search_results[search_key] = filtered_urls
-                self.status_var.set(f"Found {len(filtered_urls)} images")
-                image_urls = filtered_urls
+                # Show the first usable image without waiting for the slower providers
+                if first_batch:
+                    self.current_result_index = 0
+                    self.ui.post(self._display_image, image_urls[0])
+                    self.validator.probe_ahead(image_urls[1:])
+            
+            self.searcher.search(char_name, series_name, on_results)
+            
+            # Cache the results
+            if image_urls and self.result_cache is not None:
+                self.result_cache.put(stored_key, image_urls)
             
-            # Display the first image
             if image_urls:
-                self.current_result_index = 0
-                self._display_image(image_urls[0])
+                self._post_status(f"Found {len(image_urls)} images")
             else:
-                self.status_var.set("No images found")
-                self.image_label.config(image="", text="No images found")
+                self._post_status("No images found")
+                self.ui.post(self.image_label.config, image="", text="No images found")
                 
+        except SearchFailed as e:
+            self._post_status(str(e))
+            self.ui.post(self.image_label.config, image="", text="Search failed, try again later")
         except Exception as e:
-            self.status_var.set(f"Error: {str(e)}")
+            self._post_status(f"Error: {str(e)}")
             print(f"Error searching for image: {str(e)}")
     
-    def _display_image(self, image_url):
+    def _post_status(self, text):
+        """Set the status bar from a worker thread, keeping only the newest message per tick"""
+        self.ui.post_latest("status", self.status_var.set, text)
+    
+    def _display_image(self, image_url, position=None, failures=0):
+        """Show image_url once a worker has prepared it; call on the Tk thread
+        
+        failures counts the results that already failed on the way here.
+        """
+        self.display_generation += 1
+        self.status_var.set(f"Loading image from {image_url[:50]}...")
+        
+        # Get frame size, with fallback for when frame isn't fully sized yet
+        frame_width = max(self.image_frame.winfo_width(), 400) - 20
+        frame_height = max(self.image_frame.winfo_height(), 300) - 20
+        frame_size = (frame_width, frame_height)
+        
+        # Prefetched results are usually ready already
+        future = self.prefetcher.submit(image_url, frame_size)
+        self._poll_image(future, image_url, frame_size, position, self.display_generation, failures)
+    
+    def _poll_image(self, future, image_url, frame_size, position, generation, failures=0):
+        if generation != self.display_generation:
+            return  # Another image or card was chosen meanwhile
+        if not future.done():
+            self.root.after(20, self._poll_image, future, image_url, frame_size, position, generation, failures)
+            return
+        
         try:
-            self.status_var.set(f"Loading image from {image_url[:50]}...")
-            
-            # Download the image with timeout and headers
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-                'Referer': 'https://www.google.com/'
-            }
-            
-            response = requests.get(image_url, headers=headers, timeout=10)
-            
-            # Check if we actually got an image
-            content_type = response.headers.get('Content-Type', '')
-            if not content_type.startswith('image/'):
-                raise Exception(f"URL returned non-image content: {content_type}")
-                
-            image_data = response.content
-            
-            # Open and resize the image
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Ensure we have a standard RGB/RGBA image
-            if image.mode not in ('RGB', 'RGBA'):
-                image = image.convert('RGB')
-            
-            # Get frame size, with fallback for when frame isn't fully sized yet
-            frame_width = max(self.image_frame.winfo_width(), 400) - 20
-            frame_height = max(self.image_frame.winfo_height(), 300) - 20
-            
-            img_width, img_height = image.size
-            
-            # Skip if image is too small (likely an icon)
-            if img_width < 100 or img_height < 100:
-                raise Exception("Image too small, skipping to next")
-                
-            # Calculate resize ratio
-            ratio = min(frame_width/img_width, frame_height/img_height)
-            new_width = int(img_width * ratio)
-            new_height = int(img_height * ratio)
-            
-            # Use LANCZOS for better quality or Nearest for speed
-            # Handle different versions of PIL/Pillow
-            try:
-                if hasattr(Image, 'Resampling'):
-                    image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                else:
-                    image = image.resize((new_width, new_height), Image.LANCZOS if hasattr(Image, 'LANCZOS') else Image.ANTIALIAS)
-            except Exception:
-                # Last resort fallback
-                image = image.resize((new_width, new_height))
-            
-            # Convert to PhotoImage
-            photo = ImageTk.PhotoImage(image)
-            
-            # Update the label
-            self.image_label.config(image=photo, text="")
-            self.image_label.image = photo  # Keep a reference
-            self.current_image = image
-            
-            # Show image dimensions in status bar
-            self.status_var.set(f"Image loaded: {img_width}x{img_height} pixels")
+            image, img_width, img_height = future.result()
         except Exception as e:
             self.status_var.set(f"Error with image: {str(e)}")
             print(f"Image error ({image_url}): {str(e)}")
             
-            # Try next image automatically if available
+            # Network and server errors may pass, so only a definite failure hides the result
+            if isinstance(e, UnusableImage):
+                self.validator.reject(image_url, str(e))
+            
+            # Try the next result not already known to be unusable
             search_key = f"{self.character_label.cget('text')}|{self.series_label.cget('text')}"
             if search_key in self.search_results and self.search_results[search_key]:
                 image_urls = self.search_results[search_key]
-                if hasattr(self, 'current_result_index') and len(image_urls) > 1:
-                    self.current_result_index = (self.current_result_index + 1) % len(image_urls)
-                    self._display_image(image_urls[self.current_result_index])
+                failed_index = image_urls.index(image_url) if image_url in image_urls else self.current_result_index
+                next_index = self.validator.next_candidate(image_urls, failed_index + 1, self._skipped_results())
+                if next_index is not None and failures + 1 < len(image_urls):
+                    self.current_result_index = next_index
+                    self.validator.probe_ahead(image_urls[next_index + 1:])
+                    self._display_image(image_urls[next_index], failures=failures + 1)
                 else:
-                    self.image_label.config(image="", text="Error loading image\nTry clicking 'Next Result'")
+                    self.image_label.config(image="", text="No usable images found\nTry searching again")
             else:
                 self.image_label.config(image="", text="Error loading image\nTry searching again")
+            return
+        
+        # Only the PhotoImage is created on the Tk thread
+        photo = ImageTk.PhotoImage(image)
+        
+        # Update the label
+        self.image_label.config(image=photo, text="")
+        self.image_label.image = photo  # Keep a reference
+        self.current_image = image
+        
+        # Show image dimensions in status bar
+        if position is not None:
+            self.status_var.set(f"Showing image {position[0] + 1} of {position[1]}")
+        else:
+            self.status_var.set(f"Image loaded: {img_width}x{img_height} pixels")
+        
+        # Start preparing the results that Next Result will show
+        search_key = f"{self.character_label.cget('text')}|{self.series_label.cget('text')}"
+        image_urls = self.search_results.get(search_key) or []
+        if image_url in image_urls:
+            index = image_urls.index(image_url)
+            self._find_duplicates(image_urls)
+            skip = self._skipped_results()
+            upcoming = [url for url in image_urls[index + 1:] + image_urls[:index] if url not in skip]
+            self.validator.probe_ahead(upcoming)
+            self.prefetcher.prefetch(upcoming, frame_size)
+    
+    def _find_duplicates(self, image_urls):
+        """Hide results that are smaller copies of another result, using the stored hashes"""
+        if self.image_cache is None:
+            return
+        hashes = self.image_cache.hashes(image_urls)
+        self.hidden_duplicates = self.duplicate_filter.duplicates(image_urls, hashes)
+    
+    def _skipped_results(self):
+        return self.hidden_duplicates if self.hide_duplicates.get() else ()
+    
+    def _prepare_image(self, image_url, frame_size):
+        """Fetch, decode and resize an image to fit frame_size; runs on a worker thread"""
+        # Don't download a candidate its probe already ruled out
+        usable, reason = self.validator.check(image_url)
+        if not usable:
+            raise UnusableImage(f"Skipping unusable image: {reason}")
+        return self.fetcher.fetch(image_url, frame_size)
     
     def next_result(self):
         char_name = self.character_label.cget("text")
@@ -669,13 +3333,21 @@ class KarutaImageFinder:
         if search_key in self.search_results and self.search_results[search_key]:
             image_urls = self.search_results[search_key]
             
+            # Skip results already known to be unusable
             if hasattr(self, 'current_result_index'):
-                self.current_result_index = (self.current_result_index + 1) % len(image_urls)
-                self._display_image(image_urls[self.current_result_index])
-                self.status_var.set(f"Showing image {self.current_result_index + 1} of {len(image_urls)}")
+                next_index = self.validator.next_candidate(image_urls, self.current_result_index + 1, self._skipped_results())
+                show_position = True
             else:
-                self.current_result_index = 0
-                self._display_image(image_urls[0])
+                next_index = self.validator.next_candidate(image_urls, 0, self._skipped_results())
+                show_position = False
+            if next_index is None:
+                self.status_var.set("None of the results are usable images")
+                return
+            self.current_result_index = next_index
+            
+            # Prepared on the image workers; prefetched results are ready immediately
+            position = (self.current_result_index, len(image_urls)) if show_position else None
+            self._display_image(image_urls[self.current_result_index], position)
     
     def save_image(self):
         if not self.current_image:
@@ -720,8 +3392,8 @@ class KarutaImageFinder:
             messagebox.showerror("Error", "No card selected")
             return
         
-        # Add card to the tag set
-        self.tag_cards[tag].add(code)
+        # Add card to the tag set, recorded in the journal
+        self.tag_store.add(tag, code)
         
         # Update the tag status display
         self.update_tag_status()
@@ -745,7 +3417,7 @@ class KarutaImageFinder:
         """Generate Karuta commands for all tags"""
         tag_dropdown = tk.Toplevel(self.root)
         tag_dropdown.title("Generate Command")
-        tag_dropdown.geometry("300x250")
+        tag_dropdown.geometry("300x330")
         tag_dropdown.resizable(False, False)
         
         tk.Label(tag_dropdown, text="Select Tag:").pack(pady=10)
@@ -759,6 +3431,16 @@ class KarutaImageFinder:
             count = len(self.tag_cards[tag])
             tag_listbox.insert(tk.END, f"{tag.title()} ({count} cards)")
         
+        # Long tags are split into several commands that each fit a chat message
+        options_frame = tk.Frame(tag_dropdown)
+        options_frame.pack(fill=tk.X, padx=20, pady=5)
+        tk.Label(options_frame, text="Order:").grid(row=0, column=0, sticky=tk.W)
+        order_var = tk.StringVar(value=TagCommands.ORDERS[0])
+        ttk.Combobox(options_frame, textvariable=order_var, values=TagCommands.ORDERS, state="readonly", width=12).grid(row=0, column=1, sticky=tk.W, padx=5)
+        tk.Label(options_frame, text="Max length:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        length_var = tk.StringVar(value=str(TagCommands.DEFAULT_MAX_LENGTH))
+        tk.Entry(options_frame, textvariable=length_var, width=8).grid(row=1, column=1, sticky=tk.W, padx=5, pady=5)
+        
         def on_select():
             selection = tag_listbox.curselection()
             if not selection:
@@ -773,15 +3455,21 @@ class KarutaImageFinder:
                 messagebox.showinfo("Info", f"No cards tagged as '{selected_tag}'")
                 return
             
-            # Generate command
-            command = f"kt {selected_tag} {','.join(sorted(cards))}"
-            self.command_var.set(command)
+            try:
+                max_length = int(length_var.get())
+                commands = TagCommands(selected_tag, self._ordered_codes(cards, order_var.get()), max_length)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid max length: {str(e)}")
+                return
+            
+            # Commands are built one at a time as they are copied
+            self.tag_commands = commands
+            self.command_chunks = iter(commands)
+            if not self._next_command():
+                return
             
             # Close the window
             tag_dropdown.destroy()
-            
-            # Show confirmation
-            self.status_var.set(f"Generated command for {len(cards)} cards tagged as '{selected_tag}'")
         
         tk.Button(tag_dropdown, text="Generate", command=on_select).pack(pady=10)
         tk.Button(tag_dropdown, text="Cancel", command=tag_dropdown.destroy).pack(pady=5)
@@ -791,6 +3479,57 @@ class KarutaImageFinder:
         tag_dropdown.grab_set()
         self.root.wait_window(tag_dropdown)
     
+    def _ordered_codes(self, cards, order):
+        """The codes of a tag in the chosen order"""
+        if order == "Tag Order":
+            return list(cards)
+        codes = sorted(cards)
+        if order == "Burn Value" and self.cards is not None and len(self.cards):
+            # Highest burn value first; cards no longer in the list go last, by code
+            row_ids = self.cards.rows_of(codes)
+            values = np.where(row_ids >= 0, self.cards.column('burnValue')[row_ids], -np.inf)
+            values[np.isnan(values)] = -np.inf
+            codes = [codes[i] for i in np.argsort(-values, kind="stable")]
+        return codes
+    
+    def _next_command(self):
+        """Show the next command of the tag being copied, returning False once all are shown"""
+        if self.command_chunks is None:
+            return False
+        try:
+            command = next(self.command_chunks)
+        except StopIteration:
+            self.command_chunks = None
+            self.status_var.set(f"All {self.tag_commands.count} commands for '{self.tag_commands.tag}' copied")
+            return False
+        except ValueError as e:
+            self.command_chunks = None
+            messagebox.showerror("Error", str(e))
+            return False
+        
+        commands = self.tag_commands
+        self.command_var.set(command)
+        self.status_var.set(
+            f"Command {commands.count} for '{commands.tag}': {commands.sent} of "
+            f"{len(commands.codes)} cards, use Copy Next to copy it"
+        )
+        return True
+    
+    def copy_next_command(self):
+        """Copy the shown command of the generated tag, then show the one after it"""
+        if self.command_chunks is None:
+            messagebox.showinfo("Info", "No more commands, generate one first")
+            return
+        commands = self.tag_commands
+        copied, copied_cards = commands.count, commands.sent
+        self.root.clipboard_clear()
+        self.root.clipboard_append(self.command_var.get())
+        if self._next_command():
+            self.status_var.set(
+                f"Copied command {copied} for '{commands.tag}': {copied_cards} of {len(commands.codes)} cards, "
+                f"Copy Next copies command {commands.count}"
+            )
+    
     def copy_command(self):
         """Copy the generated command to clipboard"""
         command = self.command_var.get()
@@ -806,15 +3545,43 @@ class KarutaImageFinder:
     def clear_tags(self):
         """Clear all tagged cards"""
         if messagebox.askyesno("Confirm", "Clear all tagged cards?"):
-            for tag in self.tag_cards:
-                self.tag_cards[tag].clear()
+            self.tag_store.clear()
             
             self.update_tag_status()
             self.command_var.set("")
+            self.command_chunks = None
             self.status_var.set("All tags cleared")
+    
+    def save_tags_to_csv(self):
+        """Write the tagged cards' tags into the loaded CSV's tag column"""
+        if not self.tag_store.latest:
+            messagebox.showinfo("Info", "No tagged cards to save")
+            return
+        filepath = self.tag_store.csv_path
+        if not filepath or not os.path.exists(filepath):
+            messagebox.showerror("Error", "Please load the CSV file the cards came from")
+            return
+        if not messagebox.askyesno("Confirm", f"Write {len(self.tag_store.latest)} tags into {os.path.basename(filepath)}?"):
+            return
+        
+        try:
+            updated = self.tag_store.write_back(filepath)
+        except (OSError, ValueError, csv.Error) as e:
+            messagebox.showerror("Error", f"Failed to save tags: {str(e)}")
+            self.status_var.set("Error saving tags")
+            return
+        self.status_var.set(f"Saved tags for {updated} cards to {os.path.basename(filepath)}")
 
 
 def main():
+    if not HAS_TK:
+        print(f"Error: Missing dependency - {TK_IMPORT_ERROR}")
+        print("\nNote: Tkinter should be included with Python, but may need to be installed separately.")
+        print("- On Windows: Reinstall Python and check 'tcl/tk and IDLE'")
+        print("- On Linux: sudo apt-get install python3-tk")
+        print("- On Mac: brew install python-tk")
+        print("\nBatch mode works without it: python main.py --batch <CSV>")
+        return 1
     try:
         root = tk.Tk()
         app = KarutaImageFinder(root)
@@ -839,5 +3606,69 @@ def main():
         print(f"Critical error starting application: {str(e)}")
         messagebox.showerror("Critical Error", f"Failed to start application: {str(e)}")
 
+def batch_main(argv):
+    """Command-line entry point: resolve images for a whole collection without the UI"""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Find candidate images for every card with an empty tag, without opening the UI."
+    )
+    parser.add_argument("--batch", required=True, metavar="CSV", help="Karuta collection export to resolve")
+    parser.add_argument("--manifest", help="JSON lines results file, reused to resume (default: <CSV>.images.jsonl)")
+    parser.add_argument("--thumbs", metavar="DIR", help="also save a thumbnail of the first usable image per card")
+    parser.add_argument("--workers", type=int, default=4, help="cards resolved concurrently (default: 4)")
+    parser.add_argument("--deadline", type=float, default=12, help="seconds allowed per search (default: 12)")
+    parser.add_argument(
+        "--provider", action="append", default=[], metavar="NAME=URL",
+        help="override a search provider URL template, e.g. google=http://127.0.0.1:8000/google?q={query}"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the on-disk caches")
+    args = parser.parse_args(argv)
+    
+    providers = dict(SEARCH_PROVIDERS)
+    for override in args.provider:
+        name, _, template = override.partition("=")
+        if not template or "{query}" not in template:
+            parser.error(f"--provider needs NAME=URL with a {{query}} placeholder, got {override!r}")
+        providers[name] = template
+    
+    if not os.path.exists(args.batch):
+        print(f"Error: File not found: {args.batch}")
+        return 1
+    
+    csv_cache = result_cache = image_cache = None
+    if not args.no_cache:
+        try:
+            csv_cache = CsvCache()
+            result_cache = SearchResultCache()
+            image_cache = ImageCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Caches unavailable: {str(e)}")
+    
+    # Same loading rules as the UI: required columns and only cards with an empty tag
+    loader = CollectionLoader(args.batch, cache=csv_cache)
+    missing_cols = loader.missing_columns()
+    if missing_cols:
+        print(f"Error: CSV is missing required columns: {', '.join(missing_cols)}")
+        return 1
+    cards_df = loader.read_all()
+    print(f"Loaded {len(cards_df)} cards with empty tags out of {loader.rows_read} total cards")
+    
+    http = HttpClient()
+    resolver = BatchResolver(
+        ImageSearcher(http, providers, deadline=args.deadline),
+        ImageFetcher(http, image_cache),
+        args.manifest or os.path.splitext(args.batch)[0] + ".images.jsonl",
+        thumb_dir=args.thumbs,
+        workers=args.workers,
+        result_cache=result_cache
+    )
+    counts = resolver.run(cards_df)
+    print(f"Done: {counts['ok']} with images, {counts['empty']} without, {counts['error']} errors")
+    print(f"Results written to {resolver.manifest_path}")
+    return 0 if counts["error"] == 0 else 2
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Any arguments select the headless batch mode, otherwise start the UI
+    if len(sys.argv) > 1:
+        sys.exit(batch_main(sys.argv[1:]))
+    sys.exit(main())
\ No newline at end of file